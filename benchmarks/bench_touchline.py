@@ -0,0 +1,236 @@
+"""
+Benchmarks for pytouchline_extended.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_touchline
+	python -m benchmarks.bench_touchline --output before.json
+	python -m benchmarks.bench_touchline --compare before.json
+
+Microbenchmarks time request building, response decoding and parsing for
+realistic response sizes. The end-to-end benchmarks run reads and writes
+against the local controller emulator and report throughput and p50/p99
+latency. Results are written as JSON so runs of different versions can be
+compared with --compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+from importlib import metadata
+
+import cchardet as chardet
+
+from pytouchline_extended import PyTouchline, StreamsTransport, TouchlineSession
+from pytouchline_extended.emulator import TouchlineEmulator
+from pytouchline_extended.request import device_item
+
+SIZES = (1, 12, 50)
+
+
+# the installed package version, None when running from a plain checkout
+def _package_version():
+	try:
+		return metadata.version("pytouchline_extended")
+	except metadata.PackageNotFoundError:
+		return None
+
+
+# the git commit benchmarked, with a "-dirty" suffix for uncommitted changes
+def _git_revision():
+	root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	try:
+		revision = subprocess.run(["git", "describe", "--always", "--dirty", "--abbrev=12"], cwd=root,
+								  capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+	return revision or None
+
+
+def _response_bytes(devices, encoding="utf-8"):
+	emulator = TouchlineEmulator(devices=devices, encoding=encoding)
+	touchline = PyTouchline()
+	request = touchline._get_touchline_request(
+		[device_item(id, touchline._xml_parameters) for id in range(devices)])
+	return emulator._read(request)[2]
+
+
+def _time_per_call(function, iterations, repeat):
+	timings = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		for _ in range(iterations):
+			function()
+		timings.append((time.perf_counter() - start) / iterations)
+	return {"best_us": min(timings) * 1e6, "median_us": statistics.median(timings) * 1e6,
+			"iterations": iterations, "repeat": repeat}
+
+
+def micro_benchmarks(iterations, repeat):
+	results = {}
+	touchline = PyTouchline(url="http://127.0.0.1")
+	parameters = touchline._xml_parameters
+
+	for size in SIZES:
+		items = [device_item(id, parameters) for id in range(size)]
+		results["get_touchline_request/%d" % size] = _time_per_call(
+			lambda: touchline._get_touchline_request(items), iterations, repeat)
+
+	results["get_touchline_device_item/cached"] = _time_per_call(
+		lambda: touchline._get_touchline_device_item(5), iterations, repeat)
+	results["get_touchline_device_item/uncached"] = _time_per_call(
+		lambda: device_item.__wrapped__(5, parameters), iterations, repeat)
+
+	for size in SIZES:
+		content = _response_bytes(size)
+		tree = ET.XML(content)
+		results["parse_device/%d" % size] = _time_per_call(
+			lambda: touchline._parse_devices(tree), iterations, repeat)
+		results["decode/chardet+etree/%d" % size] = _time_per_call(
+			lambda: ET.XML(content, parser=ET.XMLParser(encoding=chardet.detect(content)['encoding'])),
+			iterations, repeat)
+		touchline.get_session().set_encoding(None)
+		results["decode/detect/%d" % size] = _time_per_call(
+			lambda: (touchline.get_session().set_encoding(None), touchline._decode_xml(content)),
+			iterations, repeat)
+		touchline.get_session().set_encoding("utf-8")
+		results["decode/cached_encoding/%d" % size] = _time_per_call(
+			lambda: touchline._decode_xml(content), iterations, repeat)
+	return results
+
+
+def _latency_summary(latencies, elapsed):
+	latencies = sorted(latencies)
+	return {
+		"requests": len(latencies),
+		"throughput_per_s": len(latencies) / elapsed,
+		"p50_ms": latencies[len(latencies) // 2] * 1e3,
+		"p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e3,
+		"max_ms": latencies[-1] * 1e3,
+	}
+
+
+async def _measure(operation, requests, concurrency):
+	latencies = []
+	semaphore = asyncio.Semaphore(concurrency)
+
+	async def timed():
+		async with semaphore:
+			start = time.perf_counter()
+			await operation()
+			latencies.append(time.perf_counter() - start)
+
+	start = time.perf_counter()
+	await asyncio.gather(*(timed() for _ in range(requests)))
+	return _latency_summary(latencies, time.perf_counter() - start)
+
+
+async def end_to_end_benchmarks(requests, concurrency, devices, latency):
+	results = {}
+	async with TouchlineEmulator(devices=devices, latency=latency) as emulator:
+		url = emulator.get_url()
+		async with TouchlineSession(url=url) as session:
+			controller = PyTouchline(url=url, session=session)
+			rooms = [PyTouchline(id=x, url=url, session=session) for x in range(devices)]
+
+			results["update_async/sequential"] = await _measure(
+				rooms[0].update_async, requests, 1)
+			results["update_all_async/%d" % devices] = await _measure(
+				lambda: controller.update_all_async(rooms), max(1, requests // 10), 1)
+
+			async def per_room_poll():
+				for room in rooms:
+					await room.update_async()
+			results["update_async_per_room/%d" % devices] = await _measure(
+				per_room_poll, max(1, requests // 10), 1)
+
+			results["write/sequential"] = await _measure(
+				lambda: rooms[0].set_target_temperature_async(21.5), requests, 1)
+
+		# one session per worker, concurrent identical reads on one session would
+		# be coalesced into a single request
+		workers = asyncio.Queue()
+		sessions = [TouchlineSession(url=url) for _ in range(concurrency)]
+		for session in sessions:
+			workers.put_nowait(PyTouchline(id=devices // 2, url=url, session=session))
+
+		async def update_on_idle_worker():
+			room = await workers.get()
+			try:
+				await room.update_async()
+			finally:
+				workers.put_nowait(room)
+		try:
+			results["update_async/concurrent"] = await _measure(
+				update_on_idle_worker, requests, concurrency)
+		finally:
+			for session in sessions:
+				await session.aclose()
+
+		async with TouchlineSession(url=url, transport=StreamsTransport) as session:
+			room = PyTouchline(id=0, url=url, session=session)
+			results["update_async/sequential/streams"] = await _measure(
+				room.update_async, requests, 1)
+	return results
+
+
+def compare(current, previous):
+	lines = []
+	for section in ("micro", "end_to_end"):
+		for name, result in current.get(section, {}).items():
+			old = previous.get(section, {}).get(name)
+			if old is None:
+				continue
+			key = "best_us" if section == "micro" else "p50_ms"
+			ratio = result[key] / old[key] if old[key] else float("nan")
+			lines.append("%-45s %12.2f -> %12.2f %s  (x%.2f)" % (
+				name, old[key], result[key], key.split("_")[1], ratio))
+	return "\n".join(lines)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark pytouchline_extended.")
+	parser.add_argument("--iterations", type=int, default=2000)
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--requests", type=int, default=200)
+	parser.add_argument("--concurrency", type=int, default=8)
+	parser.add_argument("--devices", type=int, default=12)
+	parser.add_argument("--latency", type=float, default=0.0,
+						help="latency in seconds added by the emulated controller")
+	parser.add_argument("--skip-end-to-end", action="store_true")
+	parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+	parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+	args = parser.parse_args(argv)
+
+	results = {
+		"version": _package_version(),
+		"revision": _git_revision(),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"timestamp": time.time(),
+		"micro": micro_benchmarks(args.iterations, args.repeat),
+	}
+	if not args.skip_end_to_end:
+		results["end_to_end"] = asyncio.run(end_to_end_benchmarks(
+			args.requests, args.concurrency, args.devices, args.latency))
+
+	output = json.dumps(results, indent=2, sort_keys=True)
+	if args.output:
+		with open(args.output, "w") as file:
+			file.write(output + "\n")
+	else:
+		print(output)
+
+	if args.compare:
+		with open(args.compare) as file:
+			print(compare(results, json.load(file)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+	main()
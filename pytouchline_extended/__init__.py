@@ -1,8 +1,26 @@
-import httpx
-import cchardet as chardet
 import xml.etree.ElementTree as ET
-import asyncio
 import logging
+import time
+from contextlib import aclosing
+from .cache import CacheStats, StateCache
+from .changes import Change, ChangeFeed
+from .decode import XmlItemDecoder, decode_items
+from .exceptions import (CircuitOpenError, StaleRequestError, TouchlineConnectionError, TouchlineError,
+						 TouchlineTimeoutError)
+from .history import HistoryStore, RingBuffer
+from .instrumentation import (Histogram, HistogramCollector, Instrumentation, PrometheusExporter,
+							  RequestMetrics)
+from .request import (HOSTNAME_REQUEST, NUMBER_OF_DEVICES_REQUEST, STATUS_REQUEST,
+					  build_request, device_item, device_request, names_request)
+from .priority import Priority, RequestQueue, request_priority
+from .resilience import CircuitBreaker, RetryPolicy
+from .runner import BackgroundLoop, run_sync
+from .scheduler import PollScheduler
+from .session import TouchlineSession
+from .snapshot import SnapshotStore, refresh_staggered
+from .state import DeviceState
+from .transport import HttpxTransport, StreamsTransport, Transport, TransportResponse
+from .writes import WriteQueue, extract_echo
 
 __author__ = 'brondum'
 
@@ -17,17 +35,42 @@ class PyTouchline(object):
 			id (int): The ID of the sensor.
 			url (str): The URL of the heat pump controller.
 			timeout (float): HTTP request timeout in seconds (default: 10.0).
+			max_items (int): Maximum number of values the controller is asked
+					for in a single request (default: 100).
+			session (TouchlineSession): HTTP session used for the controller
+					(default: the session shared by every instance with this URL).
+			cache_ttl (float): When set, the getters refresh the device in the
+					background once its state is older than this many seconds
+					(default: None, the caller decides when to update).
+			history (HistoryStore): Store that records the state after every
+					update (default: None).
+			snapshot (SnapshotStore): Store the state is restored from at
+					construction and saved to after every update (default: None).
 	"""
 
-	def __init__(self, id=0, url="", timeout=10.0):
+	def __init__(self, id=0, url="", timeout=10.0, max_items=100, session=None,
+				 cache_ttl=None, history=None, snapshot=None):
 		self._id = id
 		self._url = url
+		self._session = session if session is not None else TouchlineSession.for_url(url)
+		self._cache = StateCache(cache_ttl) if cache_ttl is not None else None
+		self._change_feed: ChangeFeed | None = None
+		self._change_feed_options: dict = {}
+		self._history = history
+		self._snapshot = snapshot
+		self._stale = False
 		self._timeout = timeout
+		self._max_items = max_items
 		self._temp_scale = 100
 		self._header = {"Content-Type": "text/xml"}
 		self._read_path = "/cgi-bin/ILRReadValues.cgi"
 		self._write_path = "/cgi-bin/writeVal.cgi"
-		self._parameter: dict[str, str] = {}
+		self._state = DeviceState()
+		# the state as last reported by the controller, without written-through values
+		self._polled_state = self._state
+		# slot -> (written value, time.monotonic() of the write)
+		self._pending: dict[str, tuple] = {}
+		self._write_mismatches = 0
 		self._xml_element_list: list[Parameter] = []
 		self._xml_element_list.append(
 			Parameter(name="name", desc="Name", type=Parameter.G))
@@ -52,121 +95,346 @@ class PyTouchline(object):
 		self._xml_element_list.append(
 			Parameter(name="ownerKurzID", desc="Controller ID",
 					  type=Parameter.G))
+		self._xml_index = {parameter.get_name(): parameter
+						   for parameter in self._xml_element_list}
+		self._xml_parameters = tuple((parameter.get_type() == Parameter.G, parameter.get_name())
+									 for parameter in self._xml_element_list)
+		if self._snapshot is not None:
+			state = self._snapshot.get(self._url, self._id)
+			if state is not None:
+				self._state = state
+				self._polled_state = state
+				self._stale = True
 
 	async def get_number_of_devices_async(self) -> int:
-		number_of_devices_items = []
-		number_of_devices_items.append("<i><n>totalNumberOfDevices</n></i>")
-		request = self._get_touchline_request(number_of_devices_items)
-		response = await self._request_and_receive_xml(request)
+		response = await self._request_and_receive_xml(NUMBER_OF_DEVICES_REQUEST)
 		number_of_devcies = self._parse_number_of_devices(response)
 		if number_of_devcies is None:
-			raise Exception("Could not fetch the number of devices")
+			raise TouchlineError("Could not fetch the number of devices")
 		return int(number_of_devcies)
 
 	def get_number_of_devices(self) -> int:
-		return asyncio.run(self.get_number_of_devices_async())
+		return run_sync(self.get_number_of_devices_async())
 	
 	async def get_hostname_async(self) -> str | None:
-		hostname_items = []
-		hostname_items.append("<i><n>hw.HostName</n></i>")
-		request = self._get_touchline_request(hostname_items)
-		response = await self._request_and_receive_xml(request)
-		return self._parse_number_of_devices(response)
+		response = await self._request_and_receive_xml(HOSTNAME_REQUEST)
+		return self._parse_values(response).get("hw.HostName")
 
 	def get_hostname(self) -> str | None:
-		return asyncio.run(self.get_hostname_async())
+		return run_sync(self.get_hostname_async())
 
 	async def get_status_async(self) -> str | None:
-		status_items = []
-		status_items.append("<i><n>R0.SystemStatus</n></i>")
-		request = self._get_touchline_request(status_items)
-		response = await self._request_and_receive_xml(request)
-		return self._parse_number_of_devices(response)
+		response = await self._request_and_receive_xml(STATUS_REQUEST)
+		return self._parse_values(response).get("R0.SystemStatus")
 
 	def get_status(self) -> str | None:
-		return asyncio.run(self.get_status_async())
+		return run_sync(self.get_status_async())
+
+	# read any controller parameters by their full name, e.g. "G0.RaumTemp",
+	# "CD.upass", "R0.SystemStatus" or "hw.HostName". The names are packed
+	# into requests of at most max_items names each, sent one after another
+	# like update_all_async, values the controller does not report are None.
+	async def read_parameters_async(self, names) -> dict[str, str | None]:
+		names = tuple(dict.fromkeys(names))
+		per_request = max(1, self._max_items)
+		values = {}
+		for start in range(0, len(names), per_request):
+			request = names_request(names[start:start + per_request])
+			values.update(self._parse_values(await self._request_and_receive_xml(request)))
+		return {name: values.get(name) for name in names}
+
+	def read_parameters(self, names) -> dict[str, str | None]:
+		return run_sync(self.read_parameters_async(names))
 
 	# update the roth touchline device, and parse desc, id etc.
 	async def update_async(self) -> None:
-		device_items = self._get_touchline_device_item(self._id)
-		request = self._get_touchline_request(device_items)
+		started = time.monotonic()
+		request = device_request((self._id,), self._xml_parameters)
 		response = await self._request_and_receive_xml(request)
-		return self._parse_device(response)
+		return self._parse_device(response, started)
 
 	# update the roth touchline device, and parse desc, id etc.
 	def update(self) -> None:
-		return asyncio.run(self.update_async())
-
-	def _parse_device(self, response):
-		self.devices = []
+		return run_sync(self.update_async())
+
+	# update every device on the controller using as few requests as possible
+	async def update_all_async(self, devices: list["PyTouchline"] | None = None) -> list["PyTouchline"]:
+		if devices is None:
+			number_of_devices = await self.get_number_of_devices_async()
+			devices = [PyTouchline(id=x, url=self._url, timeout=self._timeout,
+								   max_items=self._max_items, session=self._session,
+								   cache_ttl=self._cache.get_ttl() if self._cache else None,
+								   history=self._history, snapshot=self._snapshot)
+					   for x in range(number_of_devices)]
+		started = time.monotonic()
+		devices_by_id = {device._id: device for device in devices}
+		for chunk in self._chunk_device_ids(list(devices_by_id)):
+			request = device_request(tuple(chunk), self._xml_parameters)
+			response = await self._request_and_receive_xml(request)
+			for unique_id, state in self._parse_devices(response).items():
+				if unique_id in devices_by_id:
+					devices_by_id[unique_id]._state = state
+					devices_by_id[unique_id]._state_updated(started)
+		return devices
+
+	def update_all(self, devices: list["PyTouchline"] | None = None) -> list["PyTouchline"]:
+		return run_sync(self.update_all_async(devices))
+
+	# poll the whole controller and yield a Change for every value that changes,
+	# all subscribers of this instance share one poll loop
+	async def changes(self, **scheduler_options):
+		async with aclosing(self.change_batches(**scheduler_options)) as batches:
+			async for batch in batches:
+				for change in batch:
+					yield change
+
+	# scheduler_options apply while nobody else is subscribed, a later
+	# subscriber may leave them out but cannot pass different ones
+	async def change_batches(self, window: float = 0.0, **scheduler_options):
+		if self._change_feed is None or self._change_feed.get_subscriber_count() == 0:
+			self._change_feed = ChangeFeed(self, **scheduler_options)
+			self._change_feed_options = scheduler_options
+		elif scheduler_options and scheduler_options != self._change_feed_options:
+			raise ValueError("The change feed already polls with %r" % self._change_feed_options)
+		async with aclosing(self._change_feed.subscribe(window)) as batches:
+			async for batch in batches:
+				yield batch
+
+	def _chunk_device_ids(self, ids):
+		per_request = max(1, self._max_items // len(self._xml_element_list))
+		return [ids[x:x + per_request] for x in range(0, len(ids), per_request)]
+
+	def _parse_device(self, response, started=None):
+		state = self._parse_devices(response).get(self._id)
+		if state is not None:
+			self._state = state
+			self._state_updated(started)
+
+	# started is when the poll that produced the state was sent, writes made
+	# after that are confirmed by a later poll
+	def _state_updated(self, started=None):
+		self._polled_state = self._state
+		self._stale = False
+		if self._pending:
+			self._confirm_pending(started)
+		if self._snapshot is not None:
+			self._snapshot.update(self._url, self._id, self._state)
+		if self._cache is not None:
+			self._cache.mark_updated()
+		if self._history is not None:
+			self._history.record((self._url, self._id), self._state)
+
+	def _confirm_pending(self, started):
+		for slot, (value, written) in list(self._pending.items()):
+			if started is not None and written > started:
+				continue
+			del self._pending[slot]
+			actual = getattr(self._state, slot)
+			if actual != value:
+				self._write_mismatches += 1
+				logger.warning("Touchline device %d reports %s=%r after %r was written", self._id, slot,
+							   DeviceState.masked(slot, actual), DeviceState.masked(slot, value))
+
+	# apply a write the controller echoed back to the local state right away,
+	# the value stays pending until a poll reports it
+	def _write_through(self, parameter, written, echo):
+		field = DeviceState.FIELDS.get(parameter)
+		if field is None:
+			return
+		slot, kind = field
+		text = echo.decode("utf-8", errors="replace")
+		if kind != DeviceState.TEXT:
+			text, written = self._normalize_number(text), self._normalize_number(written)
+		if text != written:
+			logger.debug("Not applying write of %s=%s, the controller echoed %s", parameter,
+						 DeviceState.masked(slot, written), DeviceState.masked(slot, text))
+			return
+		state = self._state.copy()
+		state.set_value(parameter, text, self._temp_scale)
+		if getattr(state, slot) is None:
+			logger.debug("Not applying write of %s=%s, the echo does not decode", parameter,
+						 DeviceState.masked(slot, written))
+			return
+		self._state = state
+		self._pending[slot] = (getattr(state, slot), time.monotonic())
+
+	# "2150.0", "2150" and "2150.0000000000002" (20.1 * 100) are the same
+	# value to the controller, which stores whole centi-units
+	@staticmethod
+	def _normalize_number(text):
+		try:
+			number = float(text)
+		except ValueError:
+			return text
+		return str(round(number))
+
+	# slot -> written value for writes no poll has confirmed yet
+	def get_pending(self) -> dict:
+		return {slot: value for slot, (value, _) in self._pending.items()}
+
+	def get_write_mismatches(self) -> int:
+		return self._write_mismatches
+
+	def _check_cache(self):
+		if self._cache is not None:
+			self._cache.lookup(self.update_async)
+
+	def _get_unique_id(self) -> int:
+		if self._state.unique_id is not None:
+			return self._state.unique_id
+		return self._id
+
+	def get_cache_stats(self) -> CacheStats | None:
+		if self._cache is not None:
+			return self._cache.get_stats()
+		return None
+
+	# parse every device in a response, keyed by the G<n> index of the device
+	def _parse_devices(self, response) -> dict[int, DeviceState]:
+		devices: dict[int, DeviceState] = {}
 		item_list = response.find('item_list')
 		for item in item_list.iterfind("i"):
-			list_iterator = 0
-			device_list = list(item)
-			for parameter in self._xml_element_list:
-				if device_list[list_iterator].tag != "n":
-					list_iterator -= 1
-					self._parameter[parameter.get_desc()] = "NA"
+			self._parse_device_item(item, devices)
+		return devices
+
+	# match <n>/<v> pairs in one pass, in any order, skipping unknown names
+	# and names without a value
+	def _parse_device_item(self, item, devices):
+		item_devices = {}
+		shared_values = []
+		parameter = None
+		state = None
+		for element in item:
+			if element.tag == "n":
+				parameter, state = self._lookup_parameter(element.text, devices)
+				if state is not None:
+					item_devices[state.unique_id] = state
+			elif element.tag == "v" and parameter is not None:
+				if state is None:
+					shared_values.append((parameter.get_name(), element.text))
 				else:
-					self._parameter[parameter.get_desc()] = str(
-						device_list[list_iterator + 1].text)
-					if list_iterator == 0:
-						unique_id = device_list[list_iterator].text.split(".")[0].split("G")[1]
-						self._parameter["Unique ID"] = unique_id
-				list_iterator += 2
-
-	def _get_touchline_request(self, items):
-		request = "<body>"
-		request += "<version>1.0</version>"
-		request += "<client>IMaster6_02_00</client>"
-		request += "<client_ver>6.02.0006</client_ver>"
-		request += "<file_name>room</file_name>"
-		request += "<item_list_size>0</item_list_size>"
-		request += "<item_list>"
-		for item in items:
-			request += item
-		request += "</item_list>"
-		request += "</body>"
-		return request
+					state.set_value(parameter.get_name(), element.text, self._temp_scale)
+				parameter = None
+		# controller wide (CD.*) values apply to every device in the item
+		for state in item_devices.values():
+			for name, text in shared_values:
+				state.set_value(name, text, self._temp_scale)
+
+	def _lookup_parameter(self, text, devices):
+		prefix, _, name = (text or "").partition(".")
+		parameter = self._xml_index.get(name)
+		if parameter is None:
+			return None, None
+		if parameter.get_type() == Parameter.CD:
+			return (parameter, None) if prefix == "CD" else (None, None)
+		if prefix[:1] != "G" or not prefix[1:].isdigit():
+			return None, None
+		unique_id = int(prefix[1:])
+		state = devices.get(unique_id)
+		if state is None:
+			state = DeviceState(unique_id)
+			devices[unique_id] = state
+		return parameter, state
+
+	def _get_touchline_request(self, items) -> bytes:
+		return build_request(items)
 
 	async def write_parameter_async(self, parameter, value):
-		async with httpx.AsyncClient(timeout=10.0) as client:
-			response = await client.request(
-				url=self._url +
-					self._write_path + "?" +
-					"G" + str(self._parameter["Unique ID"]) +
-					"." + str(parameter) + "=" + str(value),
-				method="GET",
-			)
+		echo, _ = await self._write_async(parameter, value)
+		return echo
+
+	# returns the echo and the value that was actually sent, which differs
+	# from value when a later write replaced it in the write queue
+	async def _write_async(self, parameter, value):
+		key = "G" + str(self._get_unique_id()) + "." + str(parameter)
+		response, sent = await self._session.write(key, str(value), self._send_write)
 
 		if not response.is_success:
 			logger.error("Failed to write parameter %s: HTTP %s - %s",
 						 parameter, response.status_code, response.text)
-			raise Exception("Failed to write parameter: Roth Touchline did not respond successfully")
+			raise TouchlineError("Failed to write parameter: Roth Touchline did not respond successfully")
 
-		return response.content
+		echo = extract_echo(response.content, key)
+		self._write_through(parameter, sent, echo)
+		return echo, sent
+
+	# True when the controller echoed the value that was sent for parameter
+	async def _set_async(self, parameter, value) -> bool:
+		echo, sent = await self._write_async(parameter, value)
+		return echo.decode("utf-8") == sent
+
+	async def _send_write(self, query):
+		path = self._write_path + "?" + query
+		metrics = self._session.start_metrics("write", len(path))
+		try:
+			response = await self._session.call("write", lambda metrics: self._request_write(path, metrics), metrics)
+		except Exception as e:
+			if metrics is not None:
+				metrics.set_error(e)
+			raise
+		finally:
+			if metrics is not None:
+				self._session.report(metrics)
+		if metrics is not None:
+			metrics.bytes_in = len(response.content)
+		return response
 
 	def write_parameter(self, parameter, value):
-		return asyncio.run(self.write_parameter_async(parameter, value))
+		return run_sync(self.write_parameter_async(parameter, value))
+
+	async def _request_write(self, path, metrics):
+		timeout_errors, request_errors = self._session.get_transport_errors()
+		try:
+			return await self._session.request(
+				method="GET",
+				path=path,
+				timeout=self._timeout,
+				metrics=metrics,
+			)
+		except timeout_errors as e:
+			logger.error("Timeout (%.1fs) while writing to Touchline controller at %s: %s",
+						 self._timeout, self._url, str(e))
+			raise TouchlineTimeoutError(f"Touchline controller timeout after {self._timeout} seconds: {e}") from e
+		except request_errors as e:
+			logger.error("Network error while writing to Touchline controller at %s: %s", self._url, str(e))
+			raise TouchlineConnectionError(f"Network error connecting to Touchline controller: {e}") from e
 
+	# concurrent identical reads against the controller share one request
 	async def _request_and_receive_xml(self, req_key):
+		return await self._session.coalesce(req_key, lambda: self._fetch_xml(req_key))
+
+	async def _fetch_xml(self, req_key):
+		metrics = self._session.start_metrics("read", len(req_key))
+		try:
+			return await self._session.call("read", lambda metrics: self._receive_xml(req_key, metrics), metrics)
+		except Exception as e:
+			if metrics is not None:
+				metrics.set_error(e)
+			raise
+		finally:
+			if metrics is not None:
+				self._session.report(metrics)
+
+	async def _receive_xml(self, req_key, metrics):
 		logger.debug("Requesting URL: %s%s (timeout: %.1fs)", self._url, self._read_path, self._timeout)
 
+		timeout_errors, request_errors = self._session.get_transport_errors()
 		try:
-			async with httpx.AsyncClient(timeout=self._timeout) as client:
-				response = await client.request(
-					url=self._url + self._read_path,
-					method="POST",
-					data=req_key,
-					headers=self._header
-				)
-		except httpx.TimeoutException as e:
+			response = await self._session.request(
+				method="POST",
+				path=self._read_path,
+				timeout=self._timeout,
+				metrics=metrics,
+				content=req_key,
+				headers=self._header
+			)
+		except timeout_errors as e:
 			logger.error("Timeout (%.1fs) while connecting to Touchline controller at %s: %s",
 						 self._timeout, self._url, str(e))
-			raise Exception(f"Touchline controller timeout after {self._timeout} seconds: {e}") from e
-		except httpx.RequestError as e:
+			raise TouchlineTimeoutError(f"Touchline controller timeout after {self._timeout} seconds: {e}") from e
+		except request_errors as e:
 			logger.error("Network error while connecting to Touchline controller at %s: %s", self._url, str(e))
-			raise Exception(f"Network error connecting to Touchline controller: {e}") from e
+			raise TouchlineConnectionError(f"Network error connecting to Touchline controller: {e}") from e
 
 		logger.debug("Response status: %s, content length: %d bytes",
 					 response.status_code, len(response.content) if response.content else 0)
@@ -174,138 +442,163 @@ class PyTouchline(object):
 		if not response.is_success:
 			logger.error("Failed to read from Touchline: HTTP %s - %s",
 						 response.status_code, response.text)
-			raise Exception("Roth Touchline did not respond successfully")
+			raise TouchlineError("Roth Touchline did not respond successfully")
 
 		content = response.content
 		if not content or len(content) == 0:
 			logger.error("Received empty response from Touchline controller at %s", self._url)
-			raise Exception("Touchline controller returned empty response")
+			raise TouchlineError("Touchline controller returned empty response")
+
+		if metrics is not None:
+			metrics.bytes_in = len(content)
+		return self._decode_xml(content, metrics)
+
+	# the controller always answers in the same encoding, so it is detected
+	# once per session and only detected again when decoding with it fails
+	def _decode_xml(self, content, metrics=None):
+		encoding = self._session.get_encoding()
+		if encoding is not None:
+			start = time.perf_counter()
+			try:
+				response = decode_items((content,), encoding)
+			except (ET.ParseError, UnicodeDecodeError) as e:
+				logger.debug("Decoding with cached encoding %s failed: %s", encoding, str(e))
+			else:
+				if metrics is not None:
+					metrics.parse_time = time.perf_counter() - start
+				return response
 
+		import cchardet as chardet
 		try:
-			enc = chardet.detect(content)['encoding']
-			return ET.XML(content, parser=ET.XMLParser(encoding=enc))
-		except ET.ParseError as e:
+			start = time.perf_counter()
+			encoding = chardet.detect(content)['encoding'] or "utf-8"
+			detected = time.perf_counter()
+			response = decode_items((content,), encoding)
+			if metrics is not None:
+				metrics.detect_time = detected - start
+				metrics.parse_time = time.perf_counter() - detected
+		except (ET.ParseError, UnicodeDecodeError, LookupError) as e:
 			logger.error("Failed to parse XML response from Touchline: %s. Content: %s",
 						 str(e), content[:200])  # Log first 200 bytes
-			raise Exception(f"Invalid XML response from Touchline controller: {e}")
+			raise TouchlineError(f"Invalid XML response from Touchline controller: {e}")
+		self._session.set_encoding(encoding)
+		return response
+
+	# name -> value of every <n> in the response, None where no <v> follows
+	def _parse_values(self, response) -> dict[str, str | None]:
+		values = {}
+		item_list = response.find('item_list')
+		if item_list is None:
+			return values
+		for item in item_list.iter('i'):
+			name = None
+			for element in item:
+				if element.tag == 'n':
+					name = element.text
+					values[name] = None
+				elif element.tag == 'v' and name is not None:
+					values[name] = element.text
+					name = None
+		return values
 
 	def _parse_number_of_devices(self, response):
 		item_list = response.find('item_list')
 		item = item_list.find('i')
 		return item.find('v').text
 
-	def _get_touchline_device_item(self, id):
-		items = []
-		parameters = ""
-		for parameter in self._xml_element_list:
-			if parameter.get_type() == Parameter.G:
-				parameters += "<n>G%d.%s</n>" % (id, parameter.get_name())
-			else:
-				parameters += "<n>CD.%s</n>" % (parameter.get_name())
-		items.append("<i>" + parameters + "</i>")
-		return items
+	def _get_touchline_device_item(self, id) -> list[bytes]:
+		return [device_item(id, self._xml_parameters)]
+
+	def get_id(self) -> int:
+		return self._id
+
+	def get_session(self) -> TouchlineSession:
+		return self._session
+
+	def get_state(self) -> DeviceState:
+		return self._state
+
+	# the state of the last poll, changes are computed against this so values
+	# written through the library are still reported once a poll confirms them
+	def get_polled_state(self) -> DeviceState:
+		return self._polled_state
+
+	# True while the state is restored from a snapshot and not yet updated
+	def is_stale(self) -> bool:
+		return self._stale
 
 	def get_name(self) -> str | None:
-		if "Name" in self._parameter:
-			return self._parameter["Name"]
-		else:
-			return None
+		self._check_cache()
+		return self._state.name
 
 	async def set_name_async(self, value: str) -> bool:
-		return (await self.write_parameter_async("name",
-									value)).decode("utf-8") == str(value)
+		return await self._set_async("name", value)
 
 	def set_name(self, value: str) -> bool:
-		return asyncio.run(self.set_name_async(value))
+		return run_sync(self.set_name_async(value))
 
 	def get_current_temperature(self) -> float | None:
-		if "Temperature" in self._parameter:
-			return int(self._parameter["Temperature"]) / self._temp_scale
-		else:
-			return None
+		self._check_cache()
+		return self._state.temperature
 
 	def get_target_temperature(self) -> float | None:
-		if "Setpoint" in self._parameter:
-			return int(self._parameter["Setpoint"]) / self._temp_scale
-		else:
-			return None
+		self._check_cache()
+		return self._state.setpoint
 
 	async def set_target_temperature_async(self, value: float) -> bool:
-		return (await self.write_parameter_async("SollTemp",
-									float(value) *
-									self._temp_scale)).decode("utf-8") == \
-			   str(float(value) * self._temp_scale)
+		return await self._set_async("SollTemp", float(value) * self._temp_scale)
 
 	def set_target_temperature(self, value: float) -> bool:
-		return asyncio.run(self.set_target_temperature_async(value))
+		return run_sync(self.set_target_temperature_async(value))
 
 	def get_target_temperature_high(self) -> float | None:
-		if "Setpoint max" in self._parameter:
-			return int(self._parameter["Setpoint max"]) / self._temp_scale
-		else:
-			return None
+		self._check_cache()
+		return self._state.setpoint_max
 
 	async def set_target_temperature_high_async(self, value: float) -> bool:
-		return (await self.write_parameter_async("SollTempMaxVal",
-									float(value) *
-									self._temp_scale)).decode("utf-8") == \
-			   str(float(value) * self._temp_scale)
+		return await self._set_async("SollTempMaxVal", float(value) * self._temp_scale)
 
 	def set_target_temperature_high(self, value: float) -> bool:
-		return asyncio.run(self.set_target_temperature_high_async(value))
+		return run_sync(self.set_target_temperature_high_async(value))
 
 	def get_target_temperature_low(self) -> float | None:
-		if "Setpoint min" in self._parameter:
-			return int(self._parameter["Setpoint min"]) / self._temp_scale
-		else:
-			return None
+		self._check_cache()
+		return self._state.setpoint_min
 
 	async def set_target_temperature_low_async(self, value: float) -> bool:
-		return (await self.write_parameter_async("SollTempMinVal",
-									float(value) *
-									self._temp_scale)).decode("utf-8") == \
-			   str(float(value) * self._temp_scale)
+		return await self._set_async("SollTempMinVal", float(value) * self._temp_scale)
 
 	def set_target_temperature_low(self, value: float) -> bool:
-		return asyncio.run(self.set_target_temperature_low_async(value))
+		return run_sync(self.set_target_temperature_low_async(value))
 
 	def get_week_program(self) -> int | None:
-		if "Week program" in self._parameter:
-			return int(self._parameter["Week program"])
-		else:
-			return None
+		self._check_cache()
+		return self._state.week_program
 
 	async def set_week_program_async(self, value: int) -> bool:
-		return (await self.write_parameter_async("WeekProg",
-									value)).decode("utf-8") == str(value)
+		return await self._set_async("WeekProg", value)
 
 	def set_week_program(self, value: int) -> bool:
-		return asyncio.run(self.set_week_program_async(value))
+		return run_sync(self.set_week_program_async(value))
 
 	def get_operation_mode(self) -> int | None:
-		if "Operation mode" in self._parameter:
-			return int(self._parameter["Operation mode"])
-		else:
-			return None
+		self._check_cache()
+		return self._state.operation_mode
 
 	async def set_operation_mode_async(self, value: int) -> bool:
-		return (await self.write_parameter_async("OPMode",
-									value)).decode("utf-8") == str(value)
+		return await self._set_async("OPMode", value)
 
 	def set_operation_mode(self, value: int) -> bool:
-		return asyncio.run(self.set_operation_mode_async(value))
+		return run_sync(self.set_operation_mode_async(value))
 
 	def get_device_id(self) -> int | None:
-		if "Device ID" in self._parameter:
-			return int(self._parameter["Device ID"])
-		else:
-			return None
+		self._check_cache()
+		return self._state.device_id
 
 	def get_controller_id(self) -> int | None:
-		if "Controller ID" in self._parameter:
-			return int(self._parameter["Controller ID"])
-		else:
-			return None
+		self._check_cache()
+		return self._state.controller_id
+
 
 class Parameter(object):
 	CD = 0
@@ -325,3 +618,8 @@ class Parameter(object):
 
 	def get_type(self) -> int:
 		return self._type
+
+
+# imported last, the fleet and discovery build on PyTouchline
+from .fleet import ControllerStats, TouchlineFleet  # noqa: E402
+from .discovery import DiscoveredController, discover, discover_async  # noqa: E402
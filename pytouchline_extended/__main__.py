@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from . import PyTouchline, PollScheduler, TouchlineSession
+from .state import DeviceState
+from .transport import HttpxTransport, StreamsTransport
+
+logger = logging.getLogger(__name__)
+
+_TRANSPORTS = {"httpx": HttpxTransport, "streams": StreamsTransport}
+
+
+class _Output(object):
+	"""
+	Turns polls into JSON lines and writes them to a stream through a bounded
+	queue. When the consumer falls behind, the oldest lines are dropped.
+	"""
+
+	def __init__(self, stream, changes_only, buffer):
+		self._stream = stream
+		self._changes_only = changes_only
+		self._queue: asyncio.Queue = asyncio.Queue(maxsize=buffer)
+		self._dropped = 0
+
+	def get_dropped(self) -> int:
+		return self._dropped
+
+	def on_poll(self, controller, devices, previous):
+		url = controller.get_session().get_url()
+		now = time.time()
+		for device in devices:
+			state = device.get_state()
+			if not self._changes_only:
+				values = {key: value for key, value in state.as_dict().items() if key not in DeviceState.SECRETS}
+				self._put({"time": now, "controller": url, "device": device.get_id(), **values})
+				continue
+			old_state = previous.get(device.get_id())
+			if old_state is None:
+				old_state = DeviceState(state.unique_id)
+			for parameter, old, new in state.diff(old_state):
+				if parameter in DeviceState.SECRETS:
+					continue
+				self._put({"time": now, "controller": url, "device": device.get_id(),
+						   "parameter": parameter, "old": old, "new": new})
+
+	def _put(self, record):
+		line = json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+		if self._queue.full():
+			self._queue.get_nowait()
+			self._dropped += 1
+			if self._dropped == 1 or self._dropped % 1000 == 0:
+				logger.warning("Output is falling behind, %d lines dropped", self._dropped)
+		self._queue.put_nowait(line)
+
+	async def write(self):
+		while True:
+			line = await self._queue.get()
+			self._stream.write(line + "\n")
+			if self._queue.empty():
+				self._stream.flush()
+
+	async def drain(self):
+		while not self._queue.empty():
+			self._stream.write(self._queue.get_nowait() + "\n")
+		self._stream.flush()
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(
+		prog="python -m pytouchline_extended",
+		description="Poll Roth Touchline controllers and stream JSON lines to stdout.")
+	parser.add_argument("urls", nargs="+", metavar="URL", help="controller URL, e.g. http://192.168.1.254")
+	parser.add_argument("--interval", type=float, default=10.0, help="seconds between polls (default: 10)")
+	parser.add_argument("--changes", action="store_true",
+						help="write one line per changed value instead of one per device and poll")
+	parser.add_argument("--count", type=int, default=0,
+						help="stop after this many poll attempts of every controller, failed ones included "
+							 "(default: run forever)")
+	parser.add_argument("--timeout", type=float, default=10.0)
+	parser.add_argument("--max-items", type=int, default=100)
+	parser.add_argument("--buffer", type=int, default=10000, help="lines buffered before dropping")
+	parser.add_argument("--transport", choices=sorted(_TRANSPORTS), default="httpx")
+	return parser.parse_args(argv)
+
+
+async def run(args, stream=None) -> int:
+	output = _Output(stream if stream is not None else sys.stdout, args.changes, args.buffer)
+	sessions = [TouchlineSession(url=url, transport=_TRANSPORTS[args.transport]) for url in args.urls]
+	controllers = [PyTouchline(url=session.get_url(), timeout=args.timeout, max_items=args.max_items,
+							   session=session) for session in sessions]
+	scheduler = PollScheduler(controllers, min_interval=args.interval, max_interval=args.interval,
+							  max_error_interval=max(args.interval, 300.0), jitter=0.0)
+	# poll attempts and successful polls per controller, failed attempts count
+	# towards --count so an unreachable controller does not keep the run going
+	attempts = {id(controller): 0 for controller in controllers}
+	successes = {id(controller): 0 for controller in controllers}
+	done = asyncio.Event()
+
+	def attempted(controller):
+		attempts[id(controller)] += 1
+		if args.count and min(attempts.values()) >= args.count:
+			done.set()
+
+	def on_poll(controller, devices, previous):
+		if args.count and attempts[id(controller)] >= args.count:
+			return
+		output.on_poll(controller, devices, previous)
+		successes[id(controller)] += 1
+		attempted(controller)
+
+	def on_error(controller, error):
+		if not args.count or attempts[id(controller)] < args.count:
+			attempted(controller)
+
+	scheduler.add_listener(on_poll)
+	scheduler.add_error_listener(on_error)
+	writer = asyncio.get_running_loop().create_task(output.write())
+	try:
+		async with scheduler:
+			await done.wait()
+	finally:
+		writer.cancel()
+		await asyncio.gather(writer, return_exceptions=True)
+		await output.drain()
+		for session in sessions:
+			await session.aclose()
+	# 1 when a controller could not be polled at all
+	return 0 if all(successes.values()) else 1
+
+
+def main(argv=None):
+	logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+	args = parse_args(argv)
+	try:
+		return asyncio.run(run(args))
+	except KeyboardInterrupt:
+		return 130
+	except BrokenPipeError:
+		return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
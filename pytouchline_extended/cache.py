@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from .runner import BackgroundLoop
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats(object):
+	"""
+	Counters describing how a StateCache has been serving reads.
+
+	Attributes:
+			hits (int): Reads answered from state younger than the TTL.
+			stale (int): Reads answered from state older than the TTL.
+			misses (int): Reads made before any state was available.
+			refreshes (int): Background refreshes started.
+			refresh_errors (int): Background refreshes that failed.
+	"""
+
+	__slots__ = ("hits", "stale", "misses", "refreshes", "refresh_errors")
+
+	def __init__(self):
+		self.hits = 0
+		self.stale = 0
+		self.misses = 0
+		self.refreshes = 0
+		self.refresh_errors = 0
+
+	def as_dict(self) -> dict[str, int]:
+		return {name: getattr(self, name) for name in self.__slots__}
+
+
+class StateCache(object):
+	"""
+	Freshness tracking for the state of a PyTouchline device.
+
+	Reads within the TTL are served as they are. Reads past the TTL (or before
+	the first update) are still served from the current state, but start a
+	single background refresh; further reads do not start another one until it
+	has finished.
+
+	Attributes:
+			ttl (float): Seconds the state is considered fresh after an update.
+	"""
+
+	def __init__(self, ttl: float, clock=time.monotonic):
+		self._ttl = ttl
+		self._clock = clock
+		self._updated: float | None = None
+		self._refresh = None
+		self._stats = CacheStats()
+
+	def get_ttl(self) -> float:
+		return self._ttl
+
+	def get_stats(self) -> CacheStats:
+		return self._stats
+
+	def mark_updated(self) -> None:
+		self._updated = self._clock()
+
+	def is_fresh(self) -> bool:
+		return self._updated is not None and self._clock() - self._updated <= self._ttl
+
+	# record a read and refresh in the background when the state is not fresh
+	def lookup(self, refresh) -> None:
+		if self._updated is None:
+			self._stats.misses += 1
+		elif self._clock() - self._updated <= self._ttl:
+			self._stats.hits += 1
+			return
+		else:
+			self._stats.stale += 1
+		self._start_refresh(refresh)
+
+	def _start_refresh(self, refresh) -> None:
+		if self._refresh is not None and not self._refresh.done():
+			return
+		self._stats.refreshes += 1
+		try:
+			loop = asyncio.get_running_loop()
+		except RuntimeError:
+			self._refresh = BackgroundLoop.get().submit(refresh())
+		else:
+			self._refresh = loop.create_task(refresh())
+		self._refresh.add_done_callback(self._refresh_done)
+
+	def _refresh_done(self, future) -> None:
+		if future.cancelled():
+			return
+		error = future.exception()
+		if error is not None:
+			self._stats.refresh_errors += 1
+			logger.debug("Background refresh failed: %s", error)
+
+	async def wait_refreshed(self) -> None:
+		refresh = self._refresh
+		if refresh is None:
+			return
+		try:
+			if isinstance(refresh, asyncio.Future):
+				await refresh
+			else:
+				await asyncio.wrap_future(refresh)
+		except Exception:
+			pass
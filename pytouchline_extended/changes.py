@@ -0,0 +1,89 @@
+import asyncio
+import typing
+from .scheduler import PollScheduler
+from .state import DeviceState
+
+
+class Change(typing.NamedTuple):
+	device: typing.Any
+	parameter: str
+	old: typing.Any
+	new: typing.Any
+
+
+class ChangeFeed(object):
+	"""
+	Turns the polls of a PollScheduler into batches of Changes.
+
+	All subscribers share the scheduler's single poll loop. When the feed owns
+	its scheduler, polling starts with the first subscriber and stops when the
+	last one leaves. The first poll reports every known value as a change from
+	None. The controller password is never reported.
+
+	Attributes:
+			controller (PyTouchline): Handle for the controller to watch.
+			scheduler (PollScheduler): Scheduler to share (default: a new one
+					polling only this controller, created from scheduler_options).
+	"""
+
+	def __init__(self, controller, scheduler=None, **scheduler_options):
+		self._controller = controller
+		self._owns_scheduler = scheduler is None
+		self._scheduler = scheduler if scheduler is not None else \
+			PollScheduler([controller], **scheduler_options)
+		self._subscribers: list[asyncio.Queue] = []
+
+	def get_scheduler(self) -> PollScheduler:
+		return self._scheduler
+
+	def get_subscriber_count(self) -> int:
+		return len(self._subscribers)
+
+	def _on_update(self, controller, devices, previous):
+		if controller is not self._controller:
+			return
+		changes = []
+		for device in devices:
+			state = device.get_state()
+			old_state = previous.get(device.get_id())
+			if old_state is None:
+				old_state = DeviceState(state.unique_id)
+			for parameter, old, new in state.diff(old_state):
+				if parameter in DeviceState.SECRETS:
+					continue
+				changes.append(Change(device, parameter, old, new))
+		if changes:
+			for queue in self._subscribers:
+				queue.put_nowait(changes)
+
+	# yields lists of Changes, collecting changes for window seconds after the
+	# first one so a burst arrives as one batch
+	async def subscribe(self, window: float = 0.0):
+		queue: asyncio.Queue = asyncio.Queue()
+		self._subscribers.append(queue)
+		if len(self._subscribers) == 1:
+			self._scheduler.add_listener(self._on_update)
+			if self._owns_scheduler:
+				self._scheduler.start()
+		try:
+			while True:
+				batch = list(await queue.get())
+				if window > 0:
+					deadline = asyncio.get_running_loop().time() + window
+					while True:
+						remaining = deadline - asyncio.get_running_loop().time()
+						if remaining <= 0:
+							break
+						try:
+							batch += await asyncio.wait_for(queue.get(), remaining)
+						except asyncio.TimeoutError:
+							break
+				while not queue.empty():
+					batch += queue.get_nowait()
+				yield batch
+		finally:
+			self._subscribers.remove(queue)
+			if not self._subscribers:
+				self._scheduler.remove_listener(self._on_update)
+				if self._owns_scheduler:
+					await self._scheduler.stop()
@@ -0,0 +1,59 @@
+import codecs
+import xml.etree.ElementTree as ET
+
+
+class XmlItemDecoder(object):
+	"""
+	Incremental decoder for Touchline XML responses.
+
+	Bytes are fed as they arrive and every completed <i> element of the
+	item_list is handed out as soon as its closing tag has been parsed. Only
+	the <i> elements are kept; the rest of the document is discarded, so the
+	full response tree is never built.
+
+	Attributes:
+			encoding (str): The character encoding of the response.
+	"""
+
+	def __init__(self, encoding: str):
+		self._decoder = codecs.getincrementaldecoder(encoding)()
+		self._parser = ET.XMLPullParser(events=("start", "end"))
+		self._stack: list[ET.Element] = []
+		self._items: list[ET.Element] = []
+
+	def feed(self, chunk: bytes) -> list[ET.Element]:
+		self._parser.feed(self._decoder.decode(chunk))
+		return self._read_items()
+
+	def close(self) -> list[ET.Element]:
+		self._parser.feed(self._decoder.decode(b"", final=True))
+		self._parser.close()
+		return self._read_items()
+
+	def get_items(self) -> list[ET.Element]:
+		return self._items
+
+	def _read_items(self):
+		items = []
+		for event, element in self._parser.read_events():
+			if event == "start":
+				self._stack.append(element)
+				continue
+			self._stack.pop()
+			if element.tag == "i" and self._stack and self._stack[-1].tag == "item_list":
+				self._stack[-1].remove(element)
+				items.append(element)
+		self._items += items
+		return items
+
+
+# decode a response into a minimal <body><item_list>...</item_list></body> tree
+def decode_items(chunks, encoding: str) -> ET.Element:
+	decoder = XmlItemDecoder(encoding)
+	for chunk in chunks:
+		decoder.feed(chunk)
+	decoder.close()
+	body = ET.Element("body")
+	item_list = ET.SubElement(body, "item_list")
+	item_list.extend(decoder.get_items())
+	return body
@@ -0,0 +1,88 @@
+import asyncio
+import ipaddress
+import logging
+import time
+from typing import NamedTuple
+from . import PyTouchline
+from .exceptions import TouchlineError
+from .runner import run_sync
+from .session import TouchlineSession
+from .transport import StreamsTransport
+
+logger = logging.getLogger(__name__)
+
+_PROBE = ("hw.HostName", "totalNumberOfDevices")
+
+
+class DiscoveredController(NamedTuple):
+	"""
+	A controller found by discover.
+
+	Attributes:
+			url (str): The URL to use for PyTouchline.
+			hostname (str): The controller's hw.HostName.
+			devices (int): The number of devices.
+			latency (float): Seconds the probe took.
+	"""
+
+	url: str
+	hostname: str | None
+	devices: int
+	latency: float
+
+
+def _expand(hosts) -> list[str]:
+	if isinstance(hosts, str):
+		try:
+			return [str(address) for address in ipaddress.ip_network(hosts, strict=False).hosts()]
+		except ValueError:
+			return [hosts]
+	return list(hosts)
+
+
+def _url(host, port):
+	if host.count(":") > 1:
+		return "http://[%s]:%d" % (host, port)
+	if ":" in host:
+		return "http://%s" % host
+	return "http://%s:%d" % (host, port)
+
+
+# probe hosts for Touchline controllers concurrently. hosts is a CIDR range
+# such as "192.168.1.0/24", a single host, or a list of hosts (optionally
+# "host:port"). A host counts as a controller when it answers the hw.HostName
+# and totalNumberOfDevices query within timeout seconds. Controllers are
+# returned in the order of hosts.
+async def discover_async(hosts, port=80, concurrency=64, timeout=1.0,
+						 transport=StreamsTransport) -> list[DiscoveredController]:
+	semaphore = asyncio.Semaphore(concurrency)
+
+	async def probe(host):
+		url = _url(host, port)
+		async with semaphore:
+			session = TouchlineSession(url=url, max_connections=1, transport=transport)
+			controller = PyTouchline(url=url, timeout=timeout, session=session)
+			start = time.monotonic()
+			try:
+				values = await asyncio.wait_for(controller.read_parameters_async(_PROBE), timeout)
+			except (TouchlineError, asyncio.TimeoutError) as e:
+				logger.debug("No Touchline controller at %s: %s", url, str(e))
+				return None
+			finally:
+				await session.aclose()
+			latency = time.monotonic() - start
+		try:
+			devices = int(values["totalNumberOfDevices"])
+		except (TypeError, ValueError):
+			logger.debug("No Touchline controller at %s: invalid number of devices %r",
+						 url, values["totalNumberOfDevices"])
+			return None
+		return DiscoveredController(url, values["hw.HostName"], devices, latency)
+
+	results = await asyncio.gather(*(probe(host) for host in _expand(hosts)))
+	return [result for result in results if result is not None]
+
+
+def discover(hosts, port=80, concurrency=64, timeout=1.0,
+			 transport=StreamsTransport) -> list[DiscoveredController]:
+	return run_sync(discover_async(hosts, port, concurrency, timeout, transport))
@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import logging
+import random
+import re
+from urllib.parse import unquote_plus, urlsplit
+from xml.sax.saxutils import escape
+
+logger = logging.getLogger(__name__)
+
+_ITEM_RE = re.compile(rb"<i>(.*?)</i>", re.S)
+_NAME_RE = re.compile(rb"<n>(.*?)</n>", re.S)
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+			500: "Internal Server Error"}
+
+
+class TouchlineEmulator(object):
+	"""
+	A local stand-in for a Roth Touchline controller.
+
+	Serves /cgi-bin/ILRReadValues.cgi and /cgi-bin/writeVal.cgi over HTTP/1.1
+	with keep-alive, answering in the XML format the controller uses. Latency,
+	jitter, error rate, connection limit and response encoding can be set to
+	load-test pooling, batching and polling without hardware.
+
+	Attributes:
+			devices (int): Number of emulated rooms (default: 4).
+			host (str): Address to listen on (default: 127.0.0.1).
+			port (int): Port to listen on, 0 picks a free port (default: 0).
+			latency (float): Seconds added to every response (default: 0.0).
+			jitter (float): Random spread in seconds around latency (default: 0.0).
+			error_rate (float): Share of requests answered with HTTP 500 (default: 0.0).
+			max_connections (int): Connections served at once, further
+					connections wait for a free slot (default: None, unlimited).
+			keepalive_timeout (float): Seconds an idle connection is kept open
+					(default: 5.0).
+			encoding (str): Encoding of the XML responses (default: utf-8).
+			max_items (int): Names accepted per read, larger reads are answered
+					with HTTP 413 (default: None, unlimited).
+			hostname (str): Value of hw.HostName (default: Touchline).
+			seed (int): Seed for latency and error randomness (default: None).
+	"""
+
+	def __init__(self, devices=4, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+				 error_rate=0.0, max_connections=None, keepalive_timeout=5.0, encoding="utf-8",
+				 max_items=None, hostname="Touchline", seed=None):
+		self._host = host
+		self._port = port
+		self._latency = latency
+		self._jitter = jitter
+		self._error_rate = error_rate
+		self._max_connections = max_connections
+		self._keepalive_timeout = keepalive_timeout
+		self._encoding = encoding
+		self._max_items = max_items
+		self._random = random.Random(seed)
+		self._server = None
+		self._connection_slots = None
+		self._connections: set[asyncio.Task] = set()
+		self._values: dict[str, str] = {
+			"totalNumberOfDevices": str(devices),
+			"hw.HostName": hostname,
+			"R0.SystemStatus": "0",
+			"CD.upass": "1234",
+		}
+		for id in range(devices):
+			self._values.update({
+				"G%d.name" % id: "Room %d" % id,
+				"G%d.SollTempMaxVal" % id: "3000",
+				"G%d.SollTempMinVal" % id: "500",
+				"G%d.WeekProg" % id: "0",
+				"G%d.OPMode" % id: "0",
+				"G%d.SollTemp" % id: "2100",
+				"G%d.RaumTemp" % id: str(2000 + 10 * id),
+				"G%d.kurzID" % id: str(id + 1),
+				"G%d.ownerKurzID" % id: "100",
+			})
+		self._active_connections = 0
+		self._stats = {"connections": 0, "max_active_connections": 0,
+					   "reads": 0, "writes": 0, "errors": 0}
+
+	def get_url(self) -> str:
+		return "http://%s:%d" % (self._host, self._port)
+
+	# counters of connections, reads, writes and injected errors
+	def get_stats(self) -> dict[str, int]:
+		return dict(self._stats)
+
+	def get_value(self, name: str) -> str | None:
+		return self._values.get(name)
+
+	def set_value(self, name: str, value) -> None:
+		self._values[name] = str(value)
+
+	async def __aenter__(self) -> "TouchlineEmulator":
+		await self.start()
+		return self
+
+	async def __aexit__(self, exc_type, exc, tb) -> None:
+		await self.stop()
+
+	async def start(self) -> None:
+		if self._max_connections is not None:
+			self._connection_slots = asyncio.Semaphore(self._max_connections)
+		self._server = await asyncio.start_server(self._accept, self._host, self._port)
+		self._port = self._server.sockets[0].getsockname()[1]
+
+	async def stop(self) -> None:
+		if self._server is None:
+			return
+		self._server.close()
+		for task in list(self._connections):
+			task.cancel()
+		await asyncio.gather(*self._connections, return_exceptions=True)
+		await self._server.wait_closed()
+		self._server = None
+
+	async def serve_forever(self) -> None:
+		await self.start()
+		async with self._server:
+			await self._server.serve_forever()
+
+	async def _accept(self, reader, writer):
+		task = asyncio.current_task()
+		self._connections.add(task)
+		try:
+			if self._connection_slots is None:
+				await self._serve(reader, writer)
+			else:
+				async with self._connection_slots:
+					await self._serve(reader, writer)
+		except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+			pass
+		finally:
+			self._connections.discard(task)
+			writer.close()
+
+	async def _serve(self, reader, writer):
+		self._stats["connections"] += 1
+		self._active_connections += 1
+		self._stats["max_active_connections"] = max(self._stats["max_active_connections"],
+													 self._active_connections)
+		try:
+			while True:
+				try:
+					head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self._keepalive_timeout)
+				except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+					return
+				lines = head.decode("latin-1").split("\r\n")
+				method, target, _ = lines[0].split(" ", 2)
+				headers = {}
+				for line in lines[1:]:
+					if ":" in line:
+						key, value = line.split(":", 1)
+						headers[key.strip().lower()] = value.strip()
+				body = await reader.readexactly(int(headers.get("content-length", 0)))
+				status, content_type, content = await self._respond(method, target, body)
+				keep_alive = headers.get("connection", "").lower() != "close"
+				writer.write(("HTTP/1.1 %d %s\r\n"
+							  "Content-Type: %s\r\n"
+							  "Content-Length: %d\r\n"
+							  "Connection: %s\r\n\r\n" % (status, _REASONS[status], content_type, len(content),
+														  "keep-alive" if keep_alive else "close")
+							  ).encode("latin-1") + content)
+				await writer.drain()
+				if not keep_alive:
+					return
+		finally:
+			self._active_connections -= 1
+
+	async def _respond(self, method, target, body):
+		delay = self._latency + self._random.uniform(-self._jitter, self._jitter)
+		if delay > 0:
+			await asyncio.sleep(delay)
+		if self._random.random() < self._error_rate:
+			self._stats["errors"] += 1
+			return 500, "text/plain", b"Internal Server Error"
+		url = urlsplit(target)
+		if method == "POST" and url.path == "/cgi-bin/ILRReadValues.cgi":
+			return self._read(body)
+		if method == "GET" and url.path == "/cgi-bin/writeVal.cgi":
+			return self._write(url.query)
+		return 404, "text/plain", b"Not Found"
+
+	def _read(self, body):
+		self._stats["reads"] += 1
+		items = [_NAME_RE.findall(item) for item in _ITEM_RE.findall(body)]
+		if self._max_items is not None and sum(len(names) for names in items) > self._max_items:
+			return 413, "text/plain", b"Too many items"
+		response = ['<?xml version="1.0" encoding="%s"?>' % self._encoding,
+					"<body><version>1.0</version><item_list>"]
+		for names in items:
+			response.append("<i>")
+			for name in names:
+				name = name.decode("utf-8")
+				response.append("<n>%s</n>" % escape(name))
+				value = self._values.get(name)
+				if value is not None:
+					response.append("<v>%s</v>" % escape(value))
+			response.append("</i>")
+		response.append("</item_list></body>")
+		return 200, "text/xml", "".join(response).encode(self._encoding)
+
+	def _write(self, query):
+		self._stats["writes"] += 1
+		assignments = []
+		for assignment in query.split("&"):
+			name, separator, value = assignment.partition("=")
+			if not separator:
+				return 400, "text/plain", b"Bad Request"
+			name, value = unquote_plus(name), unquote_plus(value)
+			self._values[name] = self._normalize(name, value)
+			assignments.append((name, value))
+		if len(assignments) == 1:
+			content = assignments[0][1]
+		else:
+			content = "&".join("%s=%s" % assignment for assignment in assignments)
+		return 200, "text/plain", content.encode(self._encoding)
+
+	# numeric parameters are stored as integers, like the controller does
+	def _normalize(self, name, value):
+		current = self._values.get(name)
+		if current is not None and current.lstrip("-").isdigit():
+			try:
+				return str(int(float(value)))
+			except ValueError:
+				return value
+		return value
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Run a local Roth Touchline controller emulator.")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8080)
+	parser.add_argument("--devices", type=int, default=4)
+	parser.add_argument("--latency", type=float, default=0.0)
+	parser.add_argument("--jitter", type=float, default=0.0)
+	parser.add_argument("--error-rate", type=float, default=0.0)
+	parser.add_argument("--max-connections", type=int, default=None)
+	parser.add_argument("--keepalive-timeout", type=float, default=5.0)
+	parser.add_argument("--max-items", type=int, default=None)
+	parser.add_argument("--encoding", default="utf-8")
+	args = parser.parse_args(argv)
+
+	emulator = TouchlineEmulator(devices=args.devices, host=args.host, port=args.port,
+								 latency=args.latency, jitter=args.jitter,
+								 error_rate=args.error_rate, max_connections=args.max_connections,
+								 keepalive_timeout=args.keepalive_timeout, encoding=args.encoding, max_items=args.max_items)
+	print("Emulating %d Touchline devices on http://%s:%d" % (args.devices, args.host, args.port))
+	try:
+		asyncio.run(emulator.serve_forever())
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,18 @@
+class TouchlineError(Exception):
+	"""Raised when a Roth Touchline controller request fails."""
+
+
+class TouchlineConnectionError(TouchlineError):
+	"""Raised when the controller cannot be reached."""
+
+
+class TouchlineTimeoutError(TouchlineConnectionError):
+	"""Raised when the controller does not answer within the timeout."""
+
+
+class CircuitOpenError(TouchlineConnectionError):
+	"""Raised without contacting the controller while its circuit breaker is open."""
+
+
+class StaleRequestError(TouchlineError):
+	"""Raised for a background poll that waited in the request queue for too long."""
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit
+from . import PyTouchline
+from .exceptions import TouchlineTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class ControllerStats(object):
+	"""
+	Latency and error counters for one controller of a TouchlineFleet.
+
+	Attributes:
+			requests (int): Completed discover and poll operations.
+			errors (int): Operations that failed or timed out.
+			last_latency (float): Seconds taken by the last successful operation.
+			max_latency (float): Slowest successful operation in seconds.
+			last_error (Exception): The most recent failure.
+	"""
+
+	__slots__ = ("requests", "errors", "last_latency", "total_latency", "max_latency", "last_error")
+
+	def __init__(self):
+		self.requests = 0
+		self.errors = 0
+		self.last_latency: float | None = None
+		self.total_latency = 0.0
+		self.max_latency = 0.0
+		self.last_error: Exception | None = None
+
+	def get_mean_latency(self) -> float | None:
+		successes = self.requests - self.errors
+		if successes == 0:
+			return None
+		return self.total_latency / successes
+
+	def record(self, latency: float) -> None:
+		self.requests += 1
+		self.last_latency = latency
+		self.total_latency += latency
+		self.max_latency = max(self.max_latency, latency)
+
+	def record_error(self, error: Exception) -> None:
+		self.requests += 1
+		self.errors += 1
+		self.last_error = error
+
+	def as_dict(self) -> dict:
+		return {
+			"requests": self.requests,
+			"errors": self.errors,
+			"last_latency": self.last_latency,
+			"mean_latency": self.get_mean_latency(),
+			"max_latency": self.max_latency,
+			"last_error": None if self.last_error is None else str(self.last_error),
+		}
+
+
+class TouchlineFleet(object):
+	"""
+	Concurrent discovery and polling of many Roth Touchline controllers.
+
+	Controllers are handled concurrently under a global concurrency limit and
+	a per host limit. Every operation has its own deadline, so a slow or dead
+	controller only fails its own entry of the result.
+
+	Attributes:
+			urls (list[str]): The URLs of the controllers.
+			max_concurrency (int): Controllers handled at once (default: 32).
+			per_host_limit (int): Controllers handled at once per host name, whatever
+					their port (default: 1).
+			timeout (float): Deadline in seconds for one controller operation
+					(default: 10.0).
+	"""
+
+	def __init__(self, urls, max_concurrency=32, per_host_limit=1, timeout=10.0):
+		self._timeout = timeout
+		self._per_host_limit = per_host_limit
+		self._semaphore = asyncio.Semaphore(max_concurrency)
+		self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+		self._controllers = {url: PyTouchline(url=url, timeout=timeout) for url in urls}
+		self._devices: dict[str, list[PyTouchline] | None] = {url: None for url in urls}
+		self._stats = {url: ControllerStats() for url in urls}
+
+	def get_urls(self) -> list[str]:
+		return list(self._controllers)
+
+	def get_controller(self, url: str) -> PyTouchline:
+		return self._controllers[url]
+
+	def get_devices(self, url: str) -> list[PyTouchline] | None:
+		return self._devices[url]
+
+	def get_stats(self, url: str) -> ControllerStats:
+		return self._stats[url]
+
+	def get_all_stats(self) -> dict[str, dict]:
+		return {url: stats.as_dict() for url, stats in self._stats.items()}
+
+	# returns the number of devices per URL, or the exception for failed controllers
+	async def discover(self) -> dict[str, int | Exception]:
+		return await self._for_all(self._discover)
+
+	# returns the device states per URL, or the exception for failed controllers
+	async def poll(self) -> dict:
+		return await self._for_all(self._poll)
+
+	async def _for_all(self, operation):
+		urls = list(self._controllers)
+		results = await asyncio.gather(*(self._limited(url, operation) for url in urls),
+									   return_exceptions=True)
+		return dict(zip(urls, results))
+
+	# the host slot is taken before the global one, so URLs queued behind a
+	# busy host do not hold global slots other hosts could use
+	async def _limited(self, url, operation):
+		host = urlsplit(url).hostname
+		host_semaphore = self._host_semaphores.get(host)
+		if host_semaphore is None:
+			host_semaphore = asyncio.Semaphore(self._per_host_limit)
+			self._host_semaphores[host] = host_semaphore
+		async with host_semaphore, self._semaphore:
+			start = time.monotonic()
+			try:
+				result = await asyncio.wait_for(operation(url), self._timeout)
+			except asyncio.TimeoutError as e:
+				error = TouchlineTimeoutError(
+					f"Touchline controller {url} did not answer within {self._timeout} seconds")
+				self._failed(url, error)
+				raise error from e
+			except Exception as e:
+				self._failed(url, e)
+				raise
+			self._stats[url].record(time.monotonic() - start)
+			return result
+
+	def _failed(self, url, error):
+		logger.warning("Touchline controller %s failed: %s", url, str(error))
+		self._stats[url].record_error(error)
+
+	async def _discover(self, url):
+		controller = self._controllers[url]
+		number_of_devices = await controller.get_number_of_devices_async()
+		self._devices[url] = [PyTouchline(id=x, url=url, timeout=self._timeout,
+										  session=controller.get_session())
+							  for x in range(number_of_devices)]
+		return number_of_devices
+
+	async def _poll(self, url):
+		devices = await self._controllers[url].update_all_async(self._devices[url])
+		self._devices[url] = devices
+		return [device.get_state() for device in devices]
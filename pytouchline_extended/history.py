@@ -0,0 +1,177 @@
+import logging
+import time
+from array import array
+
+logger = logging.getLogger(__name__)
+
+_INT16_MIN = -32768
+_INT16_MAX = 32767
+
+
+class RingBuffer(object):
+	"""
+	A fixed-size ring of (timestamp, centi-value) samples.
+
+	Timestamps are stored as unsigned 32 bit epoch seconds and values as signed
+	16 bit hundredths, so a sample takes 6 bytes. Appending is O(1); windowed
+	queries walk back from the newest sample and stop at the window start.
+
+	Attributes:
+			capacity (int): Number of samples kept.
+	"""
+
+	__slots__ = ("_times", "_values", "_capacity", "_next", "_size", "_last_change")
+
+	def __init__(self, capacity: int):
+		self._times = array("I", bytes(4 * capacity))
+		self._values = array("h", bytes(2 * capacity))
+		self._capacity = capacity
+		self._next = 0
+		self._size = 0
+		self._last_change: int | None = None
+
+	def __len__(self) -> int:
+		return self._size
+
+	def nbytes(self) -> int:
+		return self._capacity * (self._times.itemsize + self._values.itemsize)
+
+	def append(self, timestamp: int, value: int) -> None:
+		if not self._size or self._values[self._next - 1] != value:
+			self._last_change = timestamp
+		self._times[self._next] = timestamp
+		self._values[self._next] = value
+		self._next = (self._next + 1) % self._capacity
+		self._size = min(self._size + 1, self._capacity)
+
+	def last(self) -> tuple[int, int] | None:
+		if not self._size:
+			return None
+		return self._times[self._next - 1], self._values[self._next - 1]
+
+	# timestamp of the newest sample whose value differs from the one before it
+	def last_change(self) -> int | None:
+		return self._last_change
+
+	# samples newer than or at since, newest first
+	def iter_since(self, since: int):
+		index = self._next
+		for _ in range(self._size):
+			index = (index - 1) % self._capacity
+			timestamp = self._times[index]
+			if timestamp < since:
+				return
+			yield timestamp, self._values[index]
+
+	def summary(self, since: int) -> tuple[int, int, int, int] | None:
+		count = 0
+		total = 0
+		low = _INT16_MAX
+		high = _INT16_MIN
+		for _, value in self.iter_since(since):
+			count += 1
+			total += value
+			if value < low:
+				low = value
+			if value > high:
+				high = value
+		if not count:
+			return None
+		return low, high, total, count
+
+
+class HistoryStore(object):
+	"""
+	Memory-bounded time series of device values.
+
+	Every recorded DeviceState appends one sample per tracked parameter to a
+	RingBuffer per (controller URL, device id, parameter). The memory cap is
+	explicit: at most max_series buffers of samples entries are allocated,
+	6 bytes per sample. Series beyond the cap are not recorded.
+
+	Attributes:
+			samples (int): Samples kept per series.
+			max_series (int): Maximum number of series.
+			parameters (tuple[str]): DeviceState temperature slots to track
+					(default: temperature and setpoint).
+	"""
+
+	def __init__(self, samples: int, max_series: int, parameters=("temperature", "setpoint")):
+		self._samples = samples
+		self._max_series = max_series
+		self._parameters = tuple(parameters)
+		self._series: dict[tuple, RingBuffer] = {}
+		self._full_logged = False
+
+	def get_parameters(self) -> tuple:
+		return self._parameters
+
+	# the memory allocated when every series is in use
+	def get_memory_limit(self) -> int:
+		return self._max_series * self._samples * 6
+
+	def get_memory_usage(self) -> int:
+		return sum(series.nbytes() for series in self._series.values())
+
+	def get_series(self, key, parameter: str) -> RingBuffer | None:
+		return self._series.get(tuple(key) + (parameter,))
+
+	def record(self, key, state, timestamp: float | None = None) -> None:
+		timestamp = int(time.time() if timestamp is None else timestamp)
+		for parameter in self._parameters:
+			value = getattr(state, parameter)
+			if value is None:
+				continue
+			series = self._get_or_create(tuple(key) + (parameter,))
+			if series is None:
+				continue
+			series.append(timestamp, max(_INT16_MIN, min(_INT16_MAX, round(value * 100))))
+
+	def _get_or_create(self, series_key):
+		series = self._series.get(series_key)
+		if series is None:
+			if len(self._series) >= self._max_series:
+				if not self._full_logged:
+					logger.warning("History store is full (%d series), new series are not recorded",
+								   self._max_series)
+					self._full_logged = True
+				return None
+			series = RingBuffer(self._samples)
+			self._series[series_key] = series
+		return series
+
+	def last(self, key, parameter: str) -> tuple[int, float] | None:
+		series = self.get_series(key, parameter)
+		sample = series.last() if series is not None else None
+		if sample is None:
+			return None
+		return sample[0], sample[1] / 100
+
+	def last_change(self, key, parameter: str) -> int | None:
+		series = self.get_series(key, parameter)
+		return series.last_change() if series is not None else None
+
+	# min, max and mean over the last window seconds (default: everything kept)
+	def summary(self, key, parameter: str, window: float | None = None,
+				now: float | None = None) -> dict | None:
+		series = self.get_series(key, parameter)
+		if series is None:
+			return None
+		since = 0 if window is None else int((time.time() if now is None else now) - window)
+		result = series.summary(since)
+		if result is None:
+			return None
+		low, high, total, count = result
+		return {"min": low / 100, "max": high / 100, "mean": total / count / 100, "count": count}
+
+	def min(self, key, parameter: str, window: float | None = None) -> float | None:
+		summary = self.summary(key, parameter, window)
+		return None if summary is None else summary["min"]
+
+	def max(self, key, parameter: str, window: float | None = None) -> float | None:
+		summary = self.summary(key, parameter, window)
+		return None if summary is None else summary["max"]
+
+	def mean(self, key, parameter: str, window: float | None = None) -> float | None:
+		summary = self.summary(key, parameter, window)
+		return None if summary is None else summary["mean"]
@@ -0,0 +1,243 @@
+import bisect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetrics(object):
+	"""
+	Measurements of one read or write request to a Touchline controller.
+
+	Times are in seconds and None when the phase did not happen (for example
+	connect_time on a reused keep-alive connection).
+
+	Attributes:
+			url (str): The URL of the controller.
+			kind (str): "read" or "write".
+			connect_time (float): DNS lookup and TCP connect.
+			time_to_first_byte (float): From sending the request to receiving
+					the response headers.
+			http_time (float): The whole HTTP exchange.
+			bytes_out (int): Size of the request body or query.
+			bytes_in (int): Size of the response body.
+			detect_time (float): Encoding detection of the response.
+			parse_time (float): XML parsing of the response.
+			retries (int): Attempts made after the first one.
+			error (str): Class name of the error that ended the request.
+	"""
+
+	__slots__ = ("url", "kind", "connect_time", "time_to_first_byte", "http_time",
+				 "bytes_out", "bytes_in", "detect_time", "parse_time", "retries", "error",
+				 "_http_start", "_connect_start")
+
+	TIMES = ("connect_time", "time_to_first_byte", "http_time", "detect_time", "parse_time")
+
+	def __init__(self, url: str, kind: str, bytes_out: int = 0):
+		self.url = url
+		self.kind = kind
+		self.connect_time: float | None = None
+		self.time_to_first_byte: float | None = None
+		self.http_time: float | None = None
+		self.bytes_out = bytes_out
+		self.bytes_in = 0
+		self.detect_time: float | None = None
+		self.parse_time: float | None = None
+		self.retries = 0
+		self.error: str | None = None
+		self._http_start = None
+		self._connect_start = None
+
+	def start_http(self) -> None:
+		self._http_start = time.perf_counter()
+
+	def end_http(self) -> None:
+		self.http_time = time.perf_counter() - self._http_start
+
+	# httpx trace extension callback, StreamsTransport reports the same events
+	async def trace(self, event: str, info: dict) -> None:
+		now = time.perf_counter()
+		if event == "connection.connect_tcp.started":
+			self._connect_start = now
+		elif event == "connection.connect_tcp.complete" and self._connect_start is not None:
+			self.connect_time = now - self._connect_start
+		elif event.endswith(".receive_response_headers.complete") and self._http_start is not None:
+			self.time_to_first_byte = now - self._http_start
+
+	# empty metrics for another attempt at the same request
+	def for_attempt(self) -> "RequestMetrics":
+		return RequestMetrics(self.url, self.kind, self.bytes_out)
+
+	# keep the measurements of the attempt that answered
+	def take(self, attempt: "RequestMetrics") -> None:
+		for slot in self.TIMES + ("bytes_in",):
+			setattr(self, slot, getattr(attempt, slot))
+
+	def set_error(self, error: BaseException) -> None:
+		cause = error.__cause__ if error.__cause__ is not None else error
+		self.error = type(cause).__name__
+
+
+class Instrumentation(object):
+	"""
+	Receives the RequestMetrics of every request made by the sessions it is
+	added to (see TouchlineSession.add_instrumentation).
+	"""
+
+	def on_request(self, metrics: RequestMetrics) -> None:
+		pass
+
+
+class Histogram(object):
+	"""
+	A cumulative histogram with fixed bucket upper bounds, like Prometheus.
+
+	Attributes:
+			buckets (tuple[float]): Sorted upper bounds of the buckets.
+	"""
+
+	__slots__ = ("_buckets", "_counts", "_sum", "_count")
+
+	def __init__(self, buckets):
+		self._buckets = tuple(buckets)
+		self._counts = [0] * (len(self._buckets) + 1)
+		self._sum = 0.0
+		self._count = 0
+
+	def observe(self, value: float) -> None:
+		self._counts[bisect.bisect_left(self._buckets, value)] += 1
+		self._sum += value
+		self._count += 1
+
+	def get_buckets(self) -> tuple:
+		return self._buckets
+
+	# cumulative counts per bucket, the last entry is +Inf
+	def get_cumulative_counts(self) -> list[int]:
+		counts = []
+		total = 0
+		for count in self._counts:
+			total += count
+			counts.append(total)
+		return counts
+
+	def get_sum(self) -> float:
+		return self._sum
+
+	def get_count(self) -> int:
+		return self._count
+
+	# upper bound of the bucket holding the q-th quantile
+	def quantile(self, q: float) -> float | None:
+		if self._count == 0:
+			return None
+		rank = q * self._count
+		for bound, count in zip(self._buckets + (float("inf"),), self.get_cumulative_counts()):
+			if count >= rank:
+				return bound
+		return float("inf")
+
+
+class HistogramCollector(Instrumentation):
+	"""
+	Keeps per controller histograms of every timed phase and counters of
+	requests, bytes, retries and errors in memory.
+
+	Attributes:
+			buckets (tuple[float]): Histogram bucket upper bounds in seconds.
+	"""
+
+	DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+	def __init__(self, buckets=DEFAULT_BUCKETS):
+		self._buckets = tuple(buckets)
+		# (url, kind, phase) -> Histogram
+		self._histograms: dict[tuple, Histogram] = {}
+		# (url, kind) -> [requests, retries, bytes out, bytes in]
+		self._counters: dict[tuple, list[int]] = {}
+		# (url, kind, error) -> count
+		self._errors: dict[tuple, int] = {}
+
+	def on_request(self, metrics: RequestMetrics) -> None:
+		for phase in RequestMetrics.TIMES:
+			value = getattr(metrics, phase)
+			if value is not None:
+				key = (metrics.url, metrics.kind, phase)
+				histogram = self._histograms.get(key)
+				if histogram is None:
+					histogram = self._histograms[key] = Histogram(self._buckets)
+				histogram.observe(value)
+		counters = self._counters.setdefault((metrics.url, metrics.kind), [0, 0, 0, 0])
+		counters[0] += 1
+		counters[1] += metrics.retries
+		counters[2] += metrics.bytes_out
+		counters[3] += metrics.bytes_in
+		if metrics.error is not None:
+			key = (metrics.url, metrics.kind, metrics.error)
+			self._errors[key] = self._errors.get(key, 0) + 1
+
+	def get_histogram(self, url: str, kind: str, phase: str) -> Histogram | None:
+		return self._histograms.get((url, kind, phase))
+
+	def get_histograms(self) -> dict[tuple, Histogram]:
+		return dict(self._histograms)
+
+	def get_counters(self, url: str, kind: str) -> dict[str, int]:
+		requests, retries, bytes_out, bytes_in = self._counters.get((url, kind), (0, 0, 0, 0))
+		return {"requests": requests, "retries": retries, "bytes_out": bytes_out, "bytes_in": bytes_in}
+
+	def get_all_counters(self) -> dict[tuple, dict[str, int]]:
+		return {key: self.get_counters(*key) for key in self._counters}
+
+	def get_errors(self) -> dict[tuple, int]:
+		return dict(self._errors)
+
+
+class PrometheusExporter(object):
+	"""
+	Renders a HistogramCollector in the Prometheus text exposition format.
+
+	Attributes:
+			collector (HistogramCollector): The collector to export.
+			prefix (str): Prefix of every metric name (default: touchline).
+	"""
+
+	def __init__(self, collector: HistogramCollector, prefix="touchline"):
+		self._collector = collector
+		self._prefix = prefix
+
+	def render(self) -> str:
+		p = self._prefix
+		lines = []
+
+		counters = self._collector.get_all_counters()
+		for name, field, help in (("requests_total", "requests", "Requests made."),
+								  ("request_retries_total", "retries", "Retried attempts."),
+								  ("request_bytes_out_total", "bytes_out", "Bytes sent."),
+								  ("request_bytes_in_total", "bytes_in", "Bytes received.")):
+			lines.append("# HELP %s_%s %s" % (p, name, help))
+			lines.append("# TYPE %s_%s counter" % (p, name))
+			for (url, kind), values in sorted(counters.items()):
+				lines.append('%s_%s{controller="%s",kind="%s"} %d' % (
+					p, name, _escape(url), kind, values[field]))
+
+		lines.append("# HELP %s_request_errors_total Failed requests by error class." % p)
+		lines.append("# TYPE %s_request_errors_total counter" % p)
+		for (url, kind, error), count in sorted(self._collector.get_errors().items()):
+			lines.append('%s_request_errors_total{controller="%s",kind="%s",error="%s"} %d' % (
+				p, _escape(url), kind, _escape(error), count))
+
+		lines.append("# HELP %s_request_phase_seconds Time spent per request phase." % p)
+		lines.append("# TYPE %s_request_phase_seconds histogram" % p)
+		for (url, kind, phase), histogram in sorted(self._collector.get_histograms().items()):
+			labels = 'controller="%s",kind="%s",phase="%s"' % (_escape(url), kind, phase)
+			bounds = [repr(bound) for bound in histogram.get_buckets()] + ["+Inf"]
+			for bound, count in zip(bounds, histogram.get_cumulative_counts()):
+				lines.append('%s_request_phase_seconds_bucket{%s,le="%s"} %d' % (p, labels, bound, count))
+			lines.append("%s_request_phase_seconds_sum{%s} %r" % (p, labels, histogram.get_sum()))
+			lines.append("%s_request_phase_seconds_count{%s} %d" % (p, labels, histogram.get_count()))
+		return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+	return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
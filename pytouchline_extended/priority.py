@@ -0,0 +1,112 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import time
+from .exceptions import StaleRequestError
+
+
+class Priority(object):
+	"""Priority classes of controller requests, lower values are served first."""
+
+	WRITE = 0
+	READ = 1
+	POLL = 2
+
+
+_priority: contextvars.ContextVar[int | None] = contextvars.ContextVar("touchline_priority", default=None)
+
+
+# reads made inside the block are queued with the given priority, e.g.
+# Priority.POLL for background polling
+@contextlib.contextmanager
+def request_priority(priority: int):
+	token = _priority.set(priority)
+	try:
+		yield
+	finally:
+		_priority.reset(token)
+
+
+def current_priority(default: int = Priority.READ) -> int:
+	priority = _priority.get()
+	return default if priority is None else priority
+
+
+class RequestQueue(object):
+	"""
+	Limits the requests in flight to one controller and serves waiting
+	requests by priority, then in arrival order.
+
+	Polls that waited longer than max_poll_wait are failed with
+	StaleRequestError instead of being sent, the next poll will have fresher
+	data anyway.
+
+	Attributes:
+			concurrency (int): Requests in flight at once (default: 1).
+			max_poll_wait (float): Seconds a Priority.POLL request may wait
+					(default: None, no limit).
+	"""
+
+	def __init__(self, concurrency=1, max_poll_wait=None, clock=time.monotonic):
+		self._concurrency = concurrency
+		self._max_poll_wait = max_poll_wait
+		self._clock = clock
+		self._active = 0
+		# [priority, sequence, queued at, future]
+		self._waiting: list[list] = []
+		self._sequence = itertools.count()
+		self._stale = 0
+
+	def get_concurrency(self) -> int:
+		return self._concurrency
+
+	def get_active(self) -> int:
+		return self._active
+
+	def get_waiting(self) -> int:
+		return sum(1 for entry in self._waiting if not entry[3].done())
+
+	def get_stale_count(self) -> int:
+		return self._stale
+
+	async def run(self, priority: int, attempt):
+		await self._acquire(priority)
+		try:
+			return await attempt()
+		finally:
+			self._release()
+
+	async def _acquire(self, priority):
+		if self._active < self._concurrency and not self._waiting:
+			self._active += 1
+			return
+		future = asyncio.get_running_loop().create_future()
+		heapq.heappush(self._waiting, [priority, next(self._sequence), self._clock(), future])
+		self._wake()
+		try:
+			await future
+		except asyncio.CancelledError:
+			# the slot may have been granted just before the caller was cancelled
+			if future.done() and not future.cancelled() and future.exception() is None:
+				self._release()
+			raise
+
+	def _release(self):
+		self._active -= 1
+		self._wake()
+
+	def _wake(self):
+		while self._waiting and self._active < self._concurrency:
+			priority, _, queued, future = heapq.heappop(self._waiting)
+			if future.done():
+				continue
+			if priority == Priority.POLL and self._max_poll_wait is not None and \
+					self._clock() - queued > self._max_poll_wait:
+				self._stale += 1
+				future.set_exception(StaleRequestError(
+					f"Poll dropped after waiting {self._clock() - queued:.1f} seconds for the controller"))
+				continue
+			self._active += 1
+			future.set_result(None)
@@ -0,0 +1,44 @@
+import functools
+from xml.sax.saxutils import escape
+
+# the request envelope only differs in its items, so it is kept pre-encoded
+REQUEST_HEAD = (b"<body>"
+				b"<version>1.0</version>"
+				b"<client>IMaster6_02_00</client>"
+				b"<client_ver>6.02.0006</client_ver>"
+				b"<file_name>room</file_name>"
+				b"<item_list_size>0</item_list_size>"
+				b"<item_list>")
+REQUEST_TAIL = b"</item_list></body>"
+
+
+def build_request(items) -> bytes:
+	return REQUEST_HEAD + b"".join(
+		item if isinstance(item, bytes) else item.encode("utf-8") for item in items) + REQUEST_TAIL
+
+
+# parameters is a tuple of (is_device_parameter, name) pairs
+@functools.lru_cache(maxsize=4096)
+def device_item(id: int, parameters: tuple) -> bytes:
+	names = b"".join(
+		(b"<n>G%d.%s</n>" % (id, name.encode("utf-8")) if is_device_parameter
+		 else b"<n>CD.%s</n>" % name.encode("utf-8"))
+		for is_device_parameter, name in parameters)
+	return b"<i>" + names + b"</i>"
+
+
+@functools.lru_cache(maxsize=1024)
+def device_request(ids: tuple, parameters: tuple) -> bytes:
+	return build_request(device_item(id, parameters) for id in ids)
+
+
+# any parameter names (G<n>.*, CD.*, R<n>.*, hw.*, ...) in a single item
+@functools.lru_cache(maxsize=1024)
+def names_request(names: tuple) -> bytes:
+	return build_request([b"<i>" + b"".join(
+		b"<n>%s</n>" % escape(name).encode("utf-8") for name in names) + b"</i>"])
+
+
+NUMBER_OF_DEVICES_REQUEST = build_request([b"<i><n>totalNumberOfDevices</n></i>"])
+HOSTNAME_REQUEST = build_request([b"<i><n>hw.HostName</n></i>"])
+STATUS_REQUEST = build_request([b"<i><n>R0.SystemStatus</n></i>"])
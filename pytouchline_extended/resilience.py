@@ -0,0 +1,152 @@
+import asyncio
+import collections
+import random
+import time
+from .exceptions import CircuitOpenError, StaleRequestError, TouchlineConnectionError, TouchlineError
+
+
+class RetryPolicy(object):
+	"""
+	When and how often a failed request is attempted again.
+
+	Attributes:
+			attempts (int): Total attempts including the first (default: 1, no retries).
+			backoff (float): Delay before the first retry in seconds, doubled for
+					every further retry (default: 0.1).
+			max_backoff (float): Longest delay between attempts (default: 2.0).
+			jitter (float): Relative random spread of the delay (default: 0.1).
+			retry_on (tuple[type]): Exception types that are retried
+					(default: TouchlineConnectionError).
+	"""
+
+	def __init__(self, attempts=1, backoff=0.1, max_backoff=2.0, jitter=0.1,
+				 retry_on=(TouchlineConnectionError,)):
+		self._attempts = attempts
+		self._backoff = backoff
+		self._max_backoff = max_backoff
+		self._jitter = jitter
+		self._retry_on = tuple(retry_on)
+
+	def get_attempts(self) -> int:
+		return self._attempts
+
+	def should_retry(self, error: BaseException, attempt: int) -> bool:
+		return (attempt < self._attempts and isinstance(error, self._retry_on)
+				and not isinstance(error, CircuitOpenError))
+
+	def get_delay(self, attempt: int) -> float:
+		delay = min(self._max_backoff, self._backoff * 2 ** (attempt - 1))
+		return delay * (1 + random.uniform(-self._jitter, self._jitter))
+
+
+class CircuitBreaker(object):
+	"""
+	Fails requests to a controller fast while it is down.
+
+	After failure_threshold consecutive failures the circuit opens and requests
+	raise CircuitOpenError without contacting the controller. Once reset_timeout
+	has passed a single probe request is let through (half-open): its success
+	closes the circuit, its failure opens it again.
+
+	Attributes:
+			failure_threshold (int): Consecutive failures that open the circuit
+					(default: 5).
+			reset_timeout (float): Seconds before an open circuit is probed
+					(default: 30.0).
+	"""
+
+	CLOSED = "closed"
+	OPEN = "open"
+	HALF_OPEN = "half-open"
+
+	def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+		self._failure_threshold = failure_threshold
+		self._reset_timeout = reset_timeout
+		self._clock = clock
+		self._state = self.CLOSED
+		self._failures = 0
+		self._opened: float | None = None
+		self._probe_started: float | None = None
+
+	def get_state(self) -> str:
+		return self._state
+
+	def get_failures(self) -> int:
+		return self._failures
+
+	def before_request(self) -> None:
+		if self._state == self.CLOSED:
+			return
+		now = self._clock()
+		if self._state == self.OPEN:
+			if now - self._opened < self._reset_timeout:
+				raise CircuitOpenError("Touchline controller circuit is open after %d failures" % self._failures)
+			self._state = self.HALF_OPEN
+			self._probe_started = now
+			return
+		# half-open, a probe that never reported back is replaced after reset_timeout
+		if now - self._probe_started < self._reset_timeout:
+			raise CircuitOpenError("Touchline controller circuit is half-open, waiting for the probe")
+		self._probe_started = now
+
+	def record_success(self) -> None:
+		self._state = self.CLOSED
+		self._failures = 0
+		self._opened = None
+		self._probe_started = None
+
+	def record_failure(self) -> None:
+		self._failures += 1
+		if self._state == self.HALF_OPEN or self._failures >= self._failure_threshold:
+			self._state = self.OPEN
+			self._opened = self._clock()
+			self._probe_started = None
+
+
+class LatencyWindow(object):
+	"""
+	The most recent request latencies, used to derive the hedging delay.
+
+	Attributes:
+			size (int): Number of latencies kept (default: 200).
+	"""
+
+	def __init__(self, size=200):
+		self._latencies: collections.deque = collections.deque(maxlen=size)
+
+	def add(self, latency: float) -> None:
+		self._latencies.append(latency)
+
+	def __len__(self) -> int:
+		return len(self._latencies)
+
+	def quantile(self, q: float) -> float | None:
+		if not self._latencies:
+			return None
+		latencies = sorted(self._latencies)
+		return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+# run attempt() and, if it has not finished after delay seconds, a second
+# attempt() in parallel; the first success wins and the other is cancelled
+async def hedged(attempt, delay: float):
+	tasks = [asyncio.ensure_future(attempt())]
+	try:
+		done, _ = await asyncio.wait(tasks, timeout=delay)
+		if not done:
+			tasks.append(asyncio.ensure_future(attempt()))
+		pending = set(tasks)
+		while pending:
+			done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+			for task in done:
+				if task.exception() is None:
+					return task.result()
+		raise tasks[0].exception()
+	finally:
+		for task in tasks:
+			if not task.done():
+				task.cancel()
+
+
+def counts_as_failure(error: BaseException) -> bool:
+	return isinstance(error, TouchlineError) and not isinstance(error, (CircuitOpenError, StaleRequestError))
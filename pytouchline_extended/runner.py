@@ -0,0 +1,68 @@
+import asyncio
+import concurrent.futures
+import threading
+
+
+class BackgroundLoop(object):
+	"""
+	A long-lived event loop running in a daemon thread.
+
+	The synchronous PyTouchline methods submit their coroutines to this loop,
+	so sync callers share one loop (and the sessions' warm connections) instead
+	of creating and tearing down both on every call. This also makes the sync
+	API usable from code that is itself running inside an event loop.
+	"""
+
+	_instance: "BackgroundLoop | None" = None
+	_instance_lock = threading.Lock()
+
+	def __init__(self):
+		self._loop = None
+		self._thread = None
+		self._lock = threading.Lock()
+
+	@classmethod
+	def get(cls) -> "BackgroundLoop":
+		with cls._instance_lock:
+			if cls._instance is None:
+				cls._instance = cls()
+			return cls._instance
+
+	def get_loop(self) -> asyncio.AbstractEventLoop:
+		with self._lock:
+			if self._thread is None or not self._thread.is_alive():
+				self._loop = asyncio.new_event_loop()
+				self._thread = threading.Thread(target=self._run, args=(self._loop,),
+												name="pytouchline-loop", daemon=True)
+				self._thread.start()
+			return self._loop
+
+	def _run(self, loop):
+		asyncio.set_event_loop(loop)
+		loop.run_forever()
+
+	def submit(self, coro) -> concurrent.futures.Future:
+		return asyncio.run_coroutine_threadsafe(coro, self.get_loop())
+
+	def run(self, coro, timeout: float | None = None):
+		if threading.current_thread() is self._thread:
+			coro.close()
+			raise RuntimeError("Synchronous Touchline calls cannot be made from the background loop, "
+							   "use the async methods instead")
+		return self.submit(coro).result(timeout)
+
+	def stop(self) -> None:
+		with self._lock:
+			loop, thread = self._loop, self._thread
+			self._loop = None
+			self._thread = None
+		if loop is not None:
+			loop.call_soon_threadsafe(loop.stop)
+			thread.join()
+			# lets the sessions close their connections on this loop
+			loop.run_until_complete(loop.shutdown_asyncgens())
+			loop.close()
+
+
+def run_sync(coro):
+	return BackgroundLoop.get().run(coro)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import random
+import time
+from .exceptions import StaleRequestError
+from .priority import Priority, request_priority
+
+logger = logging.getLogger(__name__)
+
+
+class _ControllerPoll(object):
+	__slots__ = ("controller", "devices", "interval", "failures", "lock", "task")
+
+	def __init__(self, controller, interval):
+		self.controller = controller
+		self.devices = None
+		self.interval = interval
+		self.failures = 0
+		self.lock = asyncio.Lock()
+		self.task = None
+
+
+class PollScheduler(object):
+	"""
+	Adaptive background polling of one or more Roth Touchline controllers.
+
+	Every controller is read with update_all_async, with at most one poll in
+	flight per controller. The interval drops to min_interval while values are
+	changing or shortly after a write, and grows by growth per unchanged poll up
+	to max_interval. A write through the controller's session cuts a longer
+	sleep short, so the next poll follows within min_interval. Failed polls
+	back off exponentially with jitter, up to max_error_interval. Polls are
+	sent with Priority.POLL, so writes and on-demand reads to the same
+	controller go first.
+
+	Listeners added with add_listener are called as
+	listener(controller, devices, previous) after every successful poll, where
+	previous maps device ids to the DeviceState of the poll before. Error listeners
+	are called as listener(controller, exception).
+
+	Attributes:
+			controllers (list[PyTouchline]): Handles for the controllers to poll,
+					their id is ignored.
+			min_interval (float): Fastest poll interval in seconds (default: 5.0).
+			max_interval (float): Slowest poll interval while values are stable
+					(default: 60.0).
+			growth (float): Interval growth per unchanged poll (default: 1.5).
+			max_error_interval (float): Longest delay after failures (default: 300.0).
+			jitter (float): Relative random spread applied to every delay (default: 0.1).
+			after_write (float): Seconds after a write during which the controller
+					is polled at min_interval (default: 30.0).
+	"""
+
+	def __init__(self, controllers, min_interval=5.0, max_interval=60.0, growth=1.5,
+				 max_error_interval=300.0, jitter=0.1, after_write=30.0):
+		self._min_interval = min_interval
+		self._max_interval = max_interval
+		self._growth = growth
+		self._max_error_interval = max_error_interval
+		self._jitter = jitter
+		self._after_write = after_write
+		self._polls = [_ControllerPoll(controller, min_interval) for controller in controllers]
+		self._listeners = []
+		self._error_listeners = []
+
+	def add_listener(self, listener) -> None:
+		self._listeners.append(listener)
+
+	def remove_listener(self, listener) -> None:
+		self._listeners.remove(listener)
+
+	def add_error_listener(self, listener) -> None:
+		self._error_listeners.append(listener)
+
+	def remove_error_listener(self, listener) -> None:
+		self._error_listeners.remove(listener)
+
+	def get_controllers(self) -> list:
+		return [poll.controller for poll in self._polls]
+
+	def get_devices(self, controller) -> list | None:
+		return self._find(controller).devices
+
+	def get_interval(self, controller) -> float:
+		return self._find(controller).interval
+
+	def is_running(self) -> bool:
+		return any(poll.task is not None and not poll.task.done() for poll in self._polls)
+
+	async def __aenter__(self) -> "PollScheduler":
+		self.start()
+		return self
+
+	async def __aexit__(self, exc_type, exc, tb) -> None:
+		await self.stop()
+
+	def start(self) -> None:
+		loop = asyncio.get_running_loop()
+		for poll in self._polls:
+			if poll.task is None or poll.task.done():
+				poll.task = loop.create_task(self._run(poll))
+
+	async def stop(self) -> None:
+		tasks = [poll.task for poll in self._polls if poll.task is not None]
+		for task in tasks:
+			task.cancel()
+		await asyncio.gather(*tasks, return_exceptions=True)
+		for poll in self._polls:
+			poll.task = None
+
+	# poll a controller right away, sharing the poll already in flight
+	async def poll_now(self, controller) -> float:
+		return await self._poll(self._find(controller))
+
+	def _find(self, controller):
+		for poll in self._polls:
+			if poll.controller is controller:
+				return poll
+		raise ValueError("Controller is not polled by this scheduler")
+
+	async def _run(self, poll):
+		while True:
+			delay = await self._poll(poll)
+			await self._sleep(poll, delay)
+
+	# sleep delay seconds, or at most about min_interval once a write is sent
+	async def _sleep(self, poll, delay):
+		written = poll.controller.get_session().get_write_event()
+		deadline = time.monotonic() + delay
+		try:
+			await asyncio.wait_for(written.wait(), delay)
+		except asyncio.TimeoutError:
+			return
+		await asyncio.sleep(max(0.0, min(deadline - time.monotonic(), self._jittered(self._min_interval))))
+
+	async def _poll(self, poll) -> float:
+		if poll.lock.locked():
+			async with poll.lock:
+				return self._jittered(poll.interval)
+		async with poll.lock:
+			previous = {}
+			if poll.devices is not None:
+				previous = {device.get_id(): device.get_polled_state() for device in poll.devices}
+			try:
+				with request_priority(Priority.POLL):
+					poll.devices = await poll.controller.update_all_async(poll.devices)
+			except asyncio.CancelledError:
+				raise
+			except StaleRequestError as e:
+				logger.debug("Poll of Touchline controller %s was dropped: %s",
+							 poll.controller.get_session().get_url(), str(e))
+				return self._jittered(poll.interval)
+			except Exception as e:
+				poll.failures += 1
+				logger.warning("Polling Touchline controller %s failed (%d in a row): %s",
+							   poll.controller.get_session().get_url(), poll.failures, str(e))
+				self._notify(self._error_listeners, poll.controller, e)
+				return self._jittered(self._error_delay(poll.failures))
+
+			poll.failures = 0
+			changed = any(previous.get(device.get_id()) != device.get_state() for device in poll.devices)
+			poll.interval = self._next_interval(poll, changed)
+			self._notify(self._listeners, poll.controller, poll.devices, previous)
+			return self._jittered(poll.interval)
+
+	def _next_interval(self, poll, changed) -> float:
+		last_write = poll.controller.get_session().get_last_write()
+		if changed or (last_write is not None and time.monotonic() - last_write < self._after_write):
+			return self._min_interval
+		return min(self._max_interval, poll.interval * self._growth)
+
+	def _error_delay(self, failures) -> float:
+		return min(self._max_error_interval, self._min_interval * 2 ** failures)
+
+	def _jittered(self, delay) -> float:
+		return delay * (1 + random.uniform(-self._jitter, self._jitter))
+
+	@staticmethod
+	def _notify(listeners, *args):
+		for listener in list(listeners):
+			try:
+				listener(*args)
+			except Exception:
+				logger.exception("Touchline poll listener failed")
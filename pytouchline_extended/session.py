@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import threading
+import time
+from .instrumentation import Instrumentation, RequestMetrics
+from .priority import Priority, RequestQueue, current_priority
+from .resilience import LatencyWindow, RetryPolicy, counts_as_failure, hedged
+from .transport import HttpxTransport
+from .writes import WriteQueue
+
+logger = logging.getLogger(__name__)
+
+
+class _LoopState(object):
+	__slots__ = ("transport", "closer", "inflight", "writes", "queue", "written")
+
+	def __init__(self):
+		self.transport = None
+		self.closer = None
+		self.inflight: dict = {}
+		self.writes: WriteQueue | None = None
+		self.queue: RequestQueue | None = None
+		self.written: asyncio.Event | None = None
+
+
+# suspended in the loop that owns transport, so loop.shutdown_asyncgens()
+# (run by asyncio.run and BackgroundLoop.stop) closes the connections before
+# the loop itself goes away
+async def _close_on_shutdown(transport):
+	try:
+		yield
+	finally:
+		try:
+			await transport.aclose()
+		except Exception as e:
+			logger.debug("Closing Touchline connections failed: %s", str(e))
+
+
+class TouchlineSession(object):
+	"""
+	A pooled, keep-alive HTTP connection to a Roth Touchline controller.
+
+	Every PyTouchline pointing at the same URL shares one session (see
+	for_url), so polls and writes reuse warm connections instead of opening a
+	new client per request. The session can also be used as an async context
+	manager to close its connections deterministically.
+
+	Connections, in-flight reads and queues belong to the event loop they were
+	created on. A session used from several loops (for example the async API
+	on the caller's loop and the sync API on the BackgroundLoop) keeps a warm
+	transport per loop, and closes it when that loop shuts down.
+
+	Identical reads issued while one is already in flight are coalesced (see
+	coalesce), so concurrent callers share a single request to the controller.
+	Writes go through a WriteQueue that can debounce and merge them. Every
+	request is reported to the Instrumentation objects added to the session.
+	Reads and writes are retried according to their RetryPolicy, can be guarded
+	by a CircuitBreaker, and reads can be hedged: when a read takes longer than
+	the hedge_quantile of recent reads, a second one is sent and the first
+	answer wins.
+
+	The HTTP requests themselves are made by a Transport, HttpxTransport by
+	default; StreamsTransport avoids the httpx dependency. At most
+	max_requests of them are in flight at once; waiting requests are served
+	writes first, then reads, then background polls (see request_priority).
+
+	Attributes:
+			url (str): The URL of the heat pump controller.
+			max_connections (int): Maximum number of open connections (default: 4).
+			max_keepalive_connections (int): Maximum number of idle connections
+					kept open for reuse (default: 4).
+			keepalive_expiry (float): Seconds an idle connection is kept open
+					(default: 15.0).
+			write_debounce (float): Seconds writes are collected before they
+					are sent (default: 0.0).
+			merge_writes (bool): Send collected writes as one request, for
+					controllers that accept several assignments (default: False).
+			read_retry (RetryPolicy): Retries for reads (default: no retries).
+			write_retry (RetryPolicy): Retries for writes (default: no retries).
+			circuit_breaker (CircuitBreaker): Breaker for the controller
+					(default: None).
+			hedge_reads (bool): Send a second read when the first is slow
+					(default: False).
+			hedge_quantile (float): Quantile of recent read latencies after
+					which the hedged read is sent (default: 0.95).
+			hedge_min_samples (int): Reads to observe before hedging (default: 20).
+			transport (type[Transport]): The transport class (default:
+					HttpxTransport).
+			max_requests (int): Requests in flight to the controller at once
+					(default: max_connections).
+			max_poll_wait (float): Seconds a background poll may wait for its
+					turn before it is dropped (default: None, no limit).
+	"""
+
+	_sessions: dict[str, "TouchlineSession"] = {}
+	_sessions_lock = threading.Lock()
+
+	def __init__(self, url="", max_connections=4, max_keepalive_connections=4,
+				 keepalive_expiry=15.0, write_debounce=0.0, merge_writes=False,
+				 read_retry=None, write_retry=None, circuit_breaker=None, hedge_reads=False,
+				 hedge_quantile=0.95, hedge_min_samples=20, transport=HttpxTransport,
+				 max_requests=None, max_poll_wait=None):
+		self._url = url
+		self._max_requests = max_requests if max_requests is not None else max_connections
+		self._max_poll_wait = max_poll_wait
+		self._queue: RequestQueue | None = None
+		self._transport_class = transport
+		self._transport_errors: tuple[tuple, tuple] | None = None
+		self._read_retry = read_retry if read_retry is not None else RetryPolicy()
+		self._write_retry = write_retry if write_retry is not None else RetryPolicy()
+		self._circuit_breaker = circuit_breaker
+		self._hedge_reads = hedge_reads
+		self._hedge_quantile = hedge_quantile
+		self._hedge_min_samples = hedge_min_samples
+		self._read_latencies = LatencyWindow()
+		self._write_debounce = write_debounce
+		self._merge_writes = merge_writes
+		self._limits = (max_connections, max_keepalive_connections, keepalive_expiry)
+		self._lock = threading.Lock()
+		self._loops: dict[asyncio.AbstractEventLoop, _LoopState] = {}
+		self._last_write: float | None = None
+		self._instrumentation: list[Instrumentation] = []
+		self._encoding: str | None = None
+
+	@classmethod
+	def for_url(cls, url: str) -> "TouchlineSession":
+		with cls._sessions_lock:
+			session = cls._sessions.get(url)
+			if session is None:
+				session = cls(url=url)
+				cls._sessions[url] = session
+			return session
+
+	def get_url(self) -> str:
+		return self._url
+
+	# time.monotonic() of the most recent write, or None
+	def get_last_write(self) -> float | None:
+		return self._last_write
+
+	def get_encoding(self) -> str | None:
+		return self._encoding
+
+	def set_encoding(self, encoding: str | None) -> None:
+		self._encoding = encoding
+
+	async def __aenter__(self) -> "TouchlineSession":
+		await self._get_transport()
+		return self
+
+	async def __aexit__(self, exc_type, exc, tb) -> None:
+		await self.aclose()
+
+	# the state of the running loop, states of closed loops are dropped
+	def _get_state(self) -> _LoopState:
+		loop = asyncio.get_running_loop()
+		with self._lock:
+			state = self._loops.get(loop)
+			if state is None:
+				self._loops = {other: other_state for other, other_state in self._loops.items()
+							   if not other.is_closed()}
+				state = _LoopState()
+				self._loops[loop] = state
+			return state
+
+	async def _get_transport(self):
+		state = self._get_state()
+		if state.transport is None:
+			state.transport = self._transport_class(*self._limits)
+			state.closer = _close_on_shutdown(state.transport)
+			await state.closer.__anext__()
+		return state.transport
+
+	def get_request_queue(self) -> RequestQueue:
+		state = self._get_state()
+		if state.queue is None:
+			state.queue = RequestQueue(self._max_requests, self._max_poll_wait)
+		return state.queue
+
+	# an event set by the next write on the running loop, so a sleeping poll
+	# loop can poll again soon after a write
+	def get_write_event(self) -> asyncio.Event:
+		state = self._get_state()
+		if state.written is None:
+			state.written = asyncio.Event()
+		return state.written
+
+	# (timeout errors, other request errors) the transport raises
+	def get_transport_errors(self) -> tuple[tuple, tuple]:
+		if self._transport_errors is None:
+			self._transport_errors = self._transport_class.get_errors()
+		return self._transport_errors
+
+	# run factory() once for all concurrent callers asking for the same key.
+	# Callers only share requests of their own priority, so an on-demand read
+	# never waits behind (or is dropped with) a queued background poll.
+	async def coalesce(self, key, factory):
+		key = (current_priority(), key)
+		inflight = self._get_state().inflight
+		task = inflight.get(key)
+		if task is None:
+			task = asyncio.get_running_loop().create_task(factory())
+			inflight[key] = task
+			task.add_done_callback(lambda done: self._forget(inflight, key, done))
+		return await asyncio.shield(task)
+
+	@staticmethod
+	def _forget(inflight, key, task):
+		if inflight.get(key) is task:
+			del inflight[key]
+		# every caller may have been cancelled, the error must not be reported as unretrieved
+		if not task.cancelled():
+			task.exception()
+
+	# queue the assignment key=value, send(query) performs the actual request.
+	# Returns (response, value sent), a later write to the same key within the
+	# debounce window replaces value.
+	async def write(self, key: str, value: str, send):
+		state = self._get_state()
+		self._last_write = time.monotonic()
+		if state.written is not None:
+			state.written.set()
+			state.written = None
+		if state.writes is None:
+			state.writes = WriteQueue(debounce=self._write_debounce, merge=self._merge_writes)
+		return await state.writes.write(key, value, send)
+
+	def get_circuit_breaker(self):
+		return self._circuit_breaker
+
+	def get_hedge_delay(self) -> float | None:
+		if not self._hedge_reads or len(self._read_latencies) < self._hedge_min_samples:
+			return None
+		return self._read_latencies.quantile(self._hedge_quantile)
+
+	# run attempt(metrics) under the retry policy of kind ("read" or "write"),
+	# the circuit breaker and, for reads, hedging. Hedged attempts measure into
+	# their own RequestMetrics and only the one that answered is kept.
+	async def call(self, kind: str, attempt, metrics: RequestMetrics | None = None):
+		policy = self._read_retry if kind == "read" else self._write_retry
+		queue = self.get_request_queue()
+		priority = Priority.WRITE if kind == "write" else current_priority()
+
+		def queued(attempt_metrics):
+			return queue.run(priority, lambda: attempt(attempt_metrics))
+
+		async def measured():
+			attempt_metrics = metrics.for_attempt() if metrics is not None else None
+			return await queued(attempt_metrics), attempt_metrics
+
+		number = 1
+		while True:
+			if self._circuit_breaker is not None:
+				self._circuit_breaker.before_request()
+			start = time.monotonic()
+			try:
+				hedge_delay = self.get_hedge_delay() if kind == "read" else None
+				if hedge_delay is None:
+					result = await queued(metrics)
+				else:
+					result, attempt_metrics = await hedged(measured, hedge_delay)
+					if metrics is not None:
+						metrics.take(attempt_metrics)
+			except Exception as e:
+				if self._circuit_breaker is not None and counts_as_failure(e):
+					self._circuit_breaker.record_failure()
+				if not policy.should_retry(e, number):
+					raise
+				logger.debug("Retrying Touchline %s after attempt %d failed: %s", kind, number, str(e))
+				if metrics is not None:
+					metrics.retries += 1
+				await asyncio.sleep(policy.get_delay(number))
+				number += 1
+				continue
+			if self._circuit_breaker is not None:
+				self._circuit_breaker.record_success()
+			if kind == "read":
+				self._read_latencies.add(time.monotonic() - start)
+			return result
+
+	def add_instrumentation(self, instrumentation: Instrumentation) -> None:
+		self._instrumentation.append(instrumentation)
+
+	def remove_instrumentation(self, instrumentation: Instrumentation) -> None:
+		self._instrumentation.remove(instrumentation)
+
+	# metrics for a new request, or None when nobody is listening
+	def start_metrics(self, kind: str, bytes_out: int = 0) -> RequestMetrics | None:
+		if not self._instrumentation:
+			return None
+		return RequestMetrics(self._url, kind, bytes_out)
+
+	def report(self, metrics: RequestMetrics) -> None:
+		for instrumentation in list(self._instrumentation):
+			try:
+				instrumentation.on_request(metrics)
+			except Exception:
+				logger.exception("Touchline instrumentation failed")
+
+	async def request(self, method: str, path: str, timeout: float,
+					  metrics: RequestMetrics | None = None, **kwargs):
+		transport = await self._get_transport()
+		if metrics is None:
+			return await transport.request(method, self._url + path, timeout, **kwargs)
+		metrics.start_http()
+		try:
+			return await transport.request(method, self._url + path, timeout, metrics=metrics, **kwargs)
+		finally:
+			metrics.end_http()
+
+	# close the connections of every loop, those of other running loops are
+	# closed on their own loop
+	async def aclose(self) -> None:
+		current = asyncio.get_running_loop()
+		with self._lock:
+			states = self._loops
+			self._loops = {}
+		for loop, state in states.items():
+			if state.closer is None or loop.is_closed():
+				continue
+			if loop is current:
+				await state.closer.aclose()
+			else:
+				asyncio.run_coroutine_threadsafe(state.closer.aclose(), loop)
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from .state import DeviceState
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore(object):
+	"""
+	Persists the last decoded state of every device to a local file.
+
+	PyTouchline instances created with a snapshot store restore their state
+	from it at construction, so the getters answer right away (is_stale()
+	reports True until the first update). Every update stores the new state;
+	the file is only rewritten when a state actually changed, at most once per
+	min_interval, and always atomically through a temporary file and
+	os.replace. The controller password is never written to the file.
+
+	Attributes:
+			path (str): The snapshot file.
+			min_interval (float): Minimum seconds between two writes (default: 1.0).
+	"""
+
+	VERSION = 1
+
+	def __init__(self, path: str, min_interval=1.0):
+		self._path = path
+		self._min_interval = min_interval
+		# url -> id -> DeviceState
+		self._states: dict[str, dict[int, DeviceState]] = {}
+		self._dirty = False
+		self._last_save = 0.0
+		self._flush_handle = None
+		self._load()
+
+	def get_path(self) -> str:
+		return self._path
+
+	def is_dirty(self) -> bool:
+		return self._dirty
+
+	def get(self, url: str, id: int) -> DeviceState | None:
+		state = self._states.get(url, {}).get(id)
+		return state.copy() if state is not None else None
+
+	def _load(self):
+		try:
+			with open(self._path) as file:
+				data = json.load(file)
+		except FileNotFoundError:
+			return
+		except (OSError, ValueError) as e:
+			logger.warning("Ignoring unreadable Touchline snapshot %s: %s", self._path, str(e))
+			return
+		if data.get("version") != self.VERSION:
+			logger.warning("Ignoring Touchline snapshot %s with unknown version", self._path)
+			return
+		for url, devices in data.get("controllers", {}).items():
+			states = self._states.setdefault(url, {})
+			for id, values in devices.items():
+				state = DeviceState()
+				for slot, value in zip(DeviceState.__slots__, values):
+					setattr(state, slot, value)
+				states[int(id)] = state
+
+	def update(self, url: str, id: int, state: DeviceState) -> None:
+		states = self._states.setdefault(url, {})
+		if states.get(id) == state:
+			return
+		states[id] = state.copy()
+		self._dirty = True
+		self._save_soon()
+
+	def _save_soon(self):
+		wait = self._last_save + self._min_interval - time.monotonic()
+		if wait <= 0:
+			self.flush()
+			return
+		if self._flush_handle is not None:
+			return
+		try:
+			loop = asyncio.get_running_loop()
+		except RuntimeError:
+			# without a loop the next update or an explicit flush() writes it
+			return
+		self._flush_handle = loop.call_later(wait, self._scheduled_flush)
+
+	def _scheduled_flush(self):
+		self._flush_handle = None
+		self.flush()
+
+	def flush(self) -> None:
+		if not self._dirty:
+			return
+		data = {
+			"version": self.VERSION,
+			"controllers": {
+				url: {str(id): [None if slot in DeviceState.SECRETS else getattr(state, slot)
+								for slot in DeviceState.__slots__]
+					  for id, state in devices.items()}
+				for url, devices in self._states.items()
+			},
+		}
+		directory = os.path.dirname(os.path.abspath(self._path))
+		descriptor, temporary = tempfile.mkstemp(prefix=".touchline-", dir=directory)
+		try:
+			with os.fdopen(descriptor, "w") as file:
+				json.dump(data, file, separators=(",", ":"))
+			os.replace(temporary, self._path)
+		except BaseException:
+			os.unlink(temporary)
+			raise
+		self._dirty = False
+		self._last_save = time.monotonic()
+
+
+# refresh the devices with one update_all_async per controller. Controllers
+# start spread evenly over spread seconds and run concurrently, so a restart
+# neither hits every controller at once nor waits on one device at a time
+async def refresh_staggered(devices, spread: float = 10.0) -> None:
+	controllers: dict[str, list] = {}
+	for device in devices:
+		controllers.setdefault(device.get_session().get_url(), []).append(device)
+	if not controllers:
+		return
+	step = spread / len(controllers)
+
+	async def refresh(url, group, delay):
+		await asyncio.sleep(delay)
+		try:
+			await group[0].update_all_async(group)
+		except Exception as e:
+			logger.warning("Refreshing Touchline controller %s failed: %s", url, str(e))
+
+	await asyncio.gather(*(refresh(url, group, number * step)
+						   for number, (url, group) in enumerate(controllers.items())))
@@ -0,0 +1,111 @@
+class DeviceState(object):
+	"""
+	The decoded state of a single Roth Touchline device.
+
+	Values are decoded once when a response is parsed: temperatures become
+	floats in degrees Celsius, modes and ids become ints. A value of None marks
+	a field the controller has not (yet) reported or reported as invalid.
+
+	Attributes:
+			unique_id (int): The G<n> index the state was read from.
+			name (str): The name of the room.
+			password (str): The controller password (CD.upass).
+			setpoint_max (float): Maximum allowed setpoint.
+			setpoint_min (float): Minimum allowed setpoint.
+			week_program (int): Active week program.
+			operation_mode (int): Active operation mode.
+			setpoint (float): Target temperature.
+			temperature (float): Current room temperature.
+			device_id (int): The device (kurz) id.
+			controller_id (int): The id of the owning controller.
+	"""
+
+	TEXT = 0
+	INTEGER = 1
+	TEMPERATURE = 2
+
+	# controller parameter name -> (slot, kind)
+	FIELDS = {
+		"name": ("name", TEXT),
+		"upass": ("password", TEXT),
+		"SollTempMaxVal": ("setpoint_max", TEMPERATURE),
+		"SollTempMinVal": ("setpoint_min", TEMPERATURE),
+		"WeekProg": ("week_program", INTEGER),
+		"OPMode": ("operation_mode", INTEGER),
+		"SollTemp": ("setpoint", TEMPERATURE),
+		"RaumTemp": ("temperature", TEMPERATURE),
+		"kurzID": ("device_id", INTEGER),
+		"ownerKurzID": ("controller_id", INTEGER),
+	}
+
+	# slots kept out of logs, files and change feeds
+	SECRETS = frozenset(("password",))
+
+	__slots__ = ("unique_id", "name", "password", "setpoint_max", "setpoint_min",
+				 "week_program", "operation_mode", "setpoint", "temperature",
+				 "device_id", "controller_id")
+
+	def __init__(self, unique_id: int | None = None):
+		self.unique_id = unique_id
+		self.name: str | None = None
+		self.password: str | None = None
+		self.setpoint_max: float | None = None
+		self.setpoint_min: float | None = None
+		self.week_program: int | None = None
+		self.operation_mode: int | None = None
+		self.setpoint: float | None = None
+		self.temperature: float | None = None
+		self.device_id: int | None = None
+		self.controller_id: int | None = None
+
+	# decode a raw controller value into its slot, returns False for unknown names
+	def set_value(self, name: str, text: str | None, temp_scale: int) -> bool:
+		field = self.FIELDS.get(name)
+		if field is None:
+			return False
+		slot, kind = field
+		setattr(self, slot, self._decode(text, kind, temp_scale))
+		return True
+
+	@staticmethod
+	def _decode(text, kind, temp_scale):
+		if text is None:
+			return None
+		if kind == DeviceState.TEXT:
+			return text
+		try:
+			value = int(text)
+		except ValueError:
+			return None
+		if kind == DeviceState.TEMPERATURE:
+			return value / temp_scale
+		return value
+
+	def as_dict(self) -> dict:
+		return {slot: getattr(self, slot) for slot in self.__slots__}
+
+	def copy(self) -> "DeviceState":
+		state = DeviceState()
+		for slot in self.__slots__:
+			setattr(state, slot, getattr(self, slot))
+		return state
+
+	# (slot, old, new) for every value that differs from previous
+	def diff(self, previous: "DeviceState") -> list[tuple]:
+		return [(slot, getattr(previous, slot), getattr(self, slot))
+				for slot in self.__slots__
+				if getattr(previous, slot) != getattr(self, slot)]
+
+	def __eq__(self, other) -> bool:
+		if not isinstance(other, DeviceState):
+			return NotImplemented
+		return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+	# value of slot as it may be logged, SECRETS are masked
+	@classmethod
+	def masked(cls, slot: str, value):
+		return "***" if slot in cls.SECRETS and value is not None else value
+
+	def __repr__(self) -> str:
+		values = ", ".join("%s=%r" % (slot, self.masked(slot, getattr(self, slot))) for slot in self.__slots__)
+		return "DeviceState(%s)" % values
@@ -0,0 +1,242 @@
+import asyncio
+import ssl
+import time
+from functools import lru_cache
+from urllib.parse import quote, urlsplit
+
+
+class HTTPProtocolError(Exception):
+	"""Raised by StreamsTransport when a response is not valid HTTP/1.1."""
+
+
+class TransportResponse(object):
+	"""
+	The parts of an HTTP response PyTouchline uses.
+
+	Attributes:
+			status_code (int): The HTTP status code.
+			content (bytes): The response body.
+			headers (dict[str, str]): Response headers with lower case names.
+	"""
+
+	__slots__ = ("status_code", "content", "headers")
+
+	def __init__(self, status_code: int, content: bytes, headers: dict[str, str]):
+		self.status_code = status_code
+		self.content = content
+		self.headers = headers
+
+	@property
+	def is_success(self) -> bool:
+		return 200 <= self.status_code < 300
+
+	@property
+	def text(self) -> str:
+		return self.content.decode("utf-8", errors="replace")
+
+
+class Transport(object):
+	"""
+	Performs the HTTP requests of a TouchlineSession.
+
+	A transport is created by the session on the event loop it is used from,
+	so implementations may bind connections to that loop.
+
+	Attributes:
+			max_connections (int): Maximum number of open connections.
+			max_keepalive_connections (int): Maximum number of idle connections
+					kept open for reuse.
+			keepalive_expiry (float): Seconds an idle connection is kept open.
+	"""
+
+	def __init__(self, max_connections=4, max_keepalive_connections=4, keepalive_expiry=15.0):
+		self._max_connections = max_connections
+		self._max_keepalive_connections = max_keepalive_connections
+		self._keepalive_expiry = keepalive_expiry
+
+	# (timeout errors, other request errors) raised by request()
+	@classmethod
+	def get_errors(cls) -> tuple[tuple, tuple]:
+		raise NotImplementedError
+
+	async def request(self, method: str, url: str, timeout: float, content: bytes | None = None,
+					  headers: dict[str, str] | None = None, metrics=None):
+		raise NotImplementedError
+
+	async def aclose(self) -> None:
+		pass
+
+
+class HttpxTransport(Transport):
+	"""
+	A transport backed by a pooled httpx.AsyncClient. httpx is imported when
+	the first transport is created.
+	"""
+
+	def __init__(self, max_connections=4, max_keepalive_connections=4, keepalive_expiry=15.0):
+		super().__init__(max_connections, max_keepalive_connections, keepalive_expiry)
+		import httpx
+		self._client = httpx.AsyncClient(limits=httpx.Limits(
+			max_connections=max_connections,
+			max_keepalive_connections=max_keepalive_connections,
+			keepalive_expiry=keepalive_expiry))
+
+	@classmethod
+	def get_errors(cls) -> tuple[tuple, tuple]:
+		import httpx
+		return (httpx.TimeoutException,), (httpx.RequestError,)
+
+	async def request(self, method: str, url: str, timeout: float, content: bytes | None = None,
+					  headers: dict[str, str] | None = None, metrics=None):
+		kwargs = {}
+		if content is not None:
+			kwargs["content"] = content
+		if headers is not None:
+			kwargs["headers"] = headers
+		if metrics is not None:
+			kwargs["extensions"] = {"trace": metrics.trace}
+		return await self._client.request(method=method, url=url, timeout=timeout, **kwargs)
+
+	async def aclose(self) -> None:
+		await self._client.aclose()
+
+
+@lru_cache(maxsize=256)
+def _split_url(url):
+	parts = urlsplit(url)
+	secure = parts.scheme == "https"
+	port = parts.port or (443 if secure else 80)
+	target = quote(parts.path or "/", safe="/%:@!$&'()*+,;=")
+	if parts.query:
+		target += "?" + quote(parts.query, safe="/%:@!$&'()*+,;=?")
+	return parts.hostname, port, secure, parts.netloc, target
+
+
+class StreamsTransport(Transport):
+	"""
+	A minimal keep-alive HTTP/1.1 client on asyncio streams.
+
+	It only speaks what the controller's CGI endpoints need: one request per
+	connection at a time, bodies with Content-Length or chunked encoding, and
+	no redirects, cookies or proxies. It needs nothing beyond the standard
+	library and skips the per-request overhead of a general purpose client.
+	"""
+
+	def __init__(self, max_connections=4, max_keepalive_connections=4, keepalive_expiry=15.0):
+		super().__init__(max_connections, max_keepalive_connections, keepalive_expiry)
+		self._slots = asyncio.Semaphore(max_connections)
+		# (host, port, secure) -> [(reader, writer, expires)]
+		self._idle: dict[tuple, list] = {}
+
+	@classmethod
+	def get_errors(cls) -> tuple[tuple, tuple]:
+		# asyncio.TimeoutError is only an alias of TimeoutError from Python 3.11
+		return ((TimeoutError, asyncio.TimeoutError),
+				(OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, HTTPProtocolError))
+
+	async def request(self, method: str, url: str, timeout: float, content: bytes | None = None,
+					  headers: dict[str, str] | None = None, metrics=None):
+		host, port, secure, netloc, target = _split_url(url)
+		head = ["%s %s HTTP/1.1\r\nHost: %s\r\n" % (method, target, netloc)]
+		if headers:
+			head.extend("%s: %s\r\n" % header for header in headers.items())
+		if content is not None or method == "POST":
+			head.append("Content-Length: %d\r\n" % len(content or b""))
+		head.append("\r\n")
+		data = "".join(head).encode("latin-1") + (content or b"")
+
+		async with self._slots:
+			return await asyncio.wait_for(
+				self._send((host, port, secure), data, method, metrics), timeout)
+
+	async def _send(self, key, data, method, metrics):
+		connection = self._take_idle(key)
+		if connection is not None:
+			try:
+				return await self._exchange(key, connection, data, method, metrics)
+			except (OSError, asyncio.IncompleteReadError):
+				# the controller closed the idle connection, try once on a new one
+				pass
+		connection = await self._connect(*key, metrics)
+		return await self._exchange(key, connection, data, method, metrics)
+
+	def _take_idle(self, key):
+		connections = self._idle.get(key)
+		now = time.monotonic()
+		while connections:
+			reader, writer, expires = connections.pop()
+			if expires > now and not reader.at_eof() and not writer.is_closing():
+				return reader, writer
+			writer.close()
+		return None
+
+	async def _connect(self, host, port, secure, metrics):
+		if metrics is not None:
+			await metrics.trace("connection.connect_tcp.started", {})
+		reader, writer = await asyncio.open_connection(
+			host, port, ssl=ssl.create_default_context() if secure else None)
+		if metrics is not None:
+			await metrics.trace("connection.connect_tcp.complete", {})
+		return reader, writer
+
+	async def _exchange(self, key, connection, data, method, metrics):
+		reader, writer = connection
+		try:
+			writer.write(data)
+			await writer.drain()
+			status_code, headers = await self._read_head(reader)
+			if metrics is not None:
+				await metrics.trace("http11.receive_response_headers.complete", {})
+			content = await self._read_body(reader, headers, method)
+		except ValueError as e:
+			writer.close()
+			raise HTTPProtocolError("Invalid response: %s" % e) from e
+		except BaseException:
+			writer.close()
+			raise
+		if headers.get("connection", "").lower() == "close" or \
+				len(self._idle.get(key, ())) >= self._max_keepalive_connections:
+			writer.close()
+		else:
+			self._idle.setdefault(key, []).append(
+				(reader, writer, time.monotonic() + self._keepalive_expiry))
+		return TransportResponse(status_code, content, headers)
+
+	@staticmethod
+	async def _read_head(reader):
+		head = await reader.readuntil(b"\r\n\r\n")
+		lines = head.decode("latin-1").split("\r\n")
+		status = lines[0].split(" ", 2)
+		if len(status) < 2 or not status[0].startswith("HTTP/") or not status[1].isdigit():
+			raise HTTPProtocolError("Invalid status line: %r" % lines[0])
+		headers = {}
+		for line in lines[1:]:
+			name, separator, value = line.partition(":")
+			if separator:
+				headers[name.strip().lower()] = value.strip()
+		return int(status[1]), headers
+
+	@staticmethod
+	async def _read_body(reader, headers, method):
+		if method == "HEAD":
+			return b""
+		if headers.get("transfer-encoding", "").lower() == "chunked":
+			chunks = []
+			while True:
+				size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+				if size == 0:
+					await reader.readuntil(b"\r\n")
+					return b"".join(chunks)
+				chunks.append(await reader.readexactly(size))
+				await reader.readexactly(2)
+		length = headers.get("content-length")
+		if length is not None:
+			return await reader.readexactly(int(length))
+		headers["connection"] = "close"
+		return await reader.read()
+
+	async def aclose(self) -> None:
+		for connections in self._idle.values():
+			for _, writer, _ in connections:
+				writer.close()
+		self._idle = {}
@@ -0,0 +1,85 @@
+import asyncio
+from urllib.parse import quote
+
+
+class WriteQueue(object):
+	"""
+	A per controller queue for writeVal.cgi assignments.
+
+	Writes are collected for the debounce window after the first pending
+	write. Repeated writes to the same parameter within the window collapse to
+	the last value, and every caller receives the response of the request that
+	was finally sent together with the value that was sent for its parameter.
+	With merge enabled, all pending assignments are sent as one request
+	(``?a=1&b=2``), otherwise one request is sent per parameter.
+
+	Attributes:
+			debounce (float): Seconds to collect writes before sending them
+					(default: 0.0, only writes issued in the same loop iteration
+					are collected).
+			merge (bool): Send all pending assignments in one request
+					(default: False).
+	"""
+
+	def __init__(self, debounce=0.0, merge=False):
+		self._debounce = debounce
+		self._merge = merge
+		# key -> [value, send, futures]
+		self._pending: dict[str, list] = {}
+		self._flush_task = None
+
+	async def write(self, key: str, value: str, send):
+		loop = asyncio.get_running_loop()
+		future = loop.create_future()
+		pending = self._pending.get(key)
+		if pending is None:
+			self._pending[key] = [value, send, [future]]
+		else:
+			pending[0] = value
+			pending[1] = send
+			pending[2].append(future)
+		if self._flush_task is None:
+			self._flush_task = loop.create_task(self._flush_later())
+		return await future
+
+	async def _flush_later(self):
+		await asyncio.sleep(self._debounce)
+		pending = self._pending
+		self._pending = {}
+		self._flush_task = None
+		if self._merge:
+			batches = [list(pending.items())]
+		else:
+			batches = [[entry] for entry in pending.items()]
+		for batch in batches:
+			await self._send(batch)
+
+	async def _send(self, batch):
+		# values are quoted so "&" or "=" in a name cannot add assignments
+		query = "&".join(key + "=" + quote(value, safe="") for key, (value, send, futures) in batch)
+		send = batch[-1][1][1]
+		try:
+			response = await send(query)
+		except Exception as e:
+			for key, (value, _, futures) in batch:
+				for future in futures:
+					if not future.done():
+						future.set_exception(e)
+			return
+		for key, (value, _, futures) in batch:
+			for future in futures:
+				if not future.done():
+					future.set_result((response, value))
+
+
+# the controller echoes a single written value; for merged writes the echo of
+# one assignment is looked up as key=value, falling back to the whole body
+def extract_echo(content: bytes, key: str) -> bytes:
+	if b"=" not in content:
+		return content
+	prefix = key.encode("utf-8") + b"="
+	for line in content.replace(b"\n", b"&").split(b"&"):
+		line = line.strip()
+		if line.startswith(prefix):
+			return line[len(prefix):]
+	return content
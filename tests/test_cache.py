@@ -0,0 +1,94 @@
+import pytest
+import xml.etree.ElementTree as ET
+from pytouchline_extended import PyTouchline, StateCache
+from unittest.mock import AsyncMock, patch
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _response(temperature):
+    return ET.fromstring(f"""
+        <body>
+            <item_list>
+                <i>
+                    <n>G0.name</n><v>Kitchen</v>
+                    <n>CD.upass</n><v>password</v>
+                    <n>G0.SollTempMaxVal</n><v>3000</v>
+                    <n>G0.SollTempMinVal</n><v>500</v>
+                    <n>G0.WeekProg</n><v>0</v>
+                    <n>G0.OPMode</n><v>1</v>
+                    <n>G0.SollTemp</n><v>2100</v>
+                    <n>G0.RaumTemp</n><v>{temperature}</v>
+                    <n>G0.kurzID</n><v>1</v>
+                    <n>G0.ownerKurzID</n><v>100</v>
+                </i>
+            </item_list>
+        </body>
+    """)
+
+
+def test_no_cache_by_default():
+    touchline = PyTouchline(id=0, url="http://192.168.1.254")
+    assert touchline.get_cache_stats() is None
+
+
+def test_state_cache_freshness():
+    clock = FakeClock()
+    cache = StateCache(ttl=30, clock=clock)
+    assert not cache.is_fresh()
+    cache.mark_updated()
+    assert cache.is_fresh()
+    clock.now += 31
+    assert not cache.is_fresh()
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_stale_and_single_refresh():
+    clock = FakeClock()
+    touchline = PyTouchline(id=0, url="http://192.168.1.254", cache_ttl=30)
+    touchline._cache._clock = clock
+
+    with patch.object(touchline, '_request_and_receive_xml', new_callable=AsyncMock) as mock_request:
+        mock_request.return_value = _response(2050)
+        await touchline.update_async()
+
+        # fresh reads never touch the controller
+        assert touchline.get_current_temperature() == 20.5
+        assert touchline.get_name() == "Kitchen"
+        assert mock_request.call_count == 1
+
+        # stale reads return the old value and start exactly one refresh
+        clock.now += 31
+        mock_request.return_value = _response(1900)
+        assert touchline.get_current_temperature() == 20.5
+        assert touchline.get_current_temperature() == 20.5
+        await touchline._cache.wait_refreshed()
+
+        assert mock_request.call_count == 2
+        assert touchline.get_current_temperature() == 19.0
+
+    stats = touchline.get_cache_stats()
+    assert stats.hits == 3
+    assert stats.stale == 2
+    assert stats.misses == 0
+    assert stats.refreshes == 1
+    assert stats.refresh_errors == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_miss_and_refresh_error():
+    touchline = PyTouchline(id=0, url="http://192.168.1.254", cache_ttl=30)
+
+    with patch.object(touchline, '_request_and_receive_xml', new_callable=AsyncMock) as mock_request:
+        mock_request.side_effect = Exception("Network error connecting to Touchline controller")
+        assert touchline.get_target_temperature() is None
+        await touchline._cache.wait_refreshed()
+
+    stats = touchline.get_cache_stats()
+    assert stats.as_dict() == {"hits": 0, "stale": 0, "misses": 1, "refreshes": 1, "refresh_errors": 1}
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from contextlib import aclosing
+import xml.etree.ElementTree as ET
+from pytouchline_extended import PyTouchline, Change, DeviceState
+
+
+def _controller(temperatures):
+    controller = PyTouchline(url="http://192.168.1.30")
+    controller.requests = 0
+
+    async def request(body):
+        if b"totalNumberOfDevices" in body:
+            return ET.fromstring("<body><item_list><i><n>totalNumberOfDevices</n><v>1</v></i></item_list></body>")
+        controller.requests += 1
+        temperature = temperatures.pop(0) if len(temperatures) > 1 else temperatures[0]
+        return ET.fromstring("<body><item_list><i><n>G0.name</n><v>Kitchen</v>"
+                             "<n>CD.upass</n><v>1234</v>"
+                             f"<n>G0.RaumTemp</n><v>{temperature}</v></i></item_list></body>")
+
+    controller._request_and_receive_xml = request
+    return controller
+
+
+def test_device_state_diff():
+    old = DeviceState(0)
+    new = DeviceState(0)
+    new.set_value("RaumTemp", "2000", 100)
+    assert new.diff(old) == [("temperature", None, 20.0)]
+    assert new.diff(new) == []
+
+
+@pytest.mark.asyncio
+async def test_changes_yield_only_deltas():
+    controller = _controller([2000, 2000, 2000, 2100])
+    received = []
+
+    async with aclosing(controller.changes(min_interval=0.001, max_interval=0.001, jitter=0.0)) as changes:
+        async for change in changes:
+            received.append(change)
+            if change.parameter == "temperature" and change.new == 21.0:
+                break
+
+    device = received[0].device
+    assert device.get_id() == 0
+    assert [(change.parameter, change.old, change.new) for change in received] == [
+        ("name", None, "Kitchen"),
+        ("temperature", None, 20.0),
+        ("temperature", 20.0, 21.0),
+    ]
+    assert received[-1] == Change(device, "temperature", 20.0, 21.0)
+    assert device.get_state().password == "1234"
+    assert controller.requests >= 4
+    assert not controller._change_feed.get_scheduler().is_running()
+
+
+@pytest.mark.asyncio
+async def test_subscribers_share_one_poll():
+    controller = _controller([2000, 2100, 2200, 2300, 2400])
+
+    async def collect():
+        temperatures = []
+        async with aclosing(controller.change_batches(min_interval=0.01, max_interval=0.01,
+                                                      jitter=0.0)) as batches:
+            async for batch in batches:
+                temperatures += [change.new for change in batch if change.parameter == "temperature"]
+                if temperatures[-1] == 24.0:
+                    return temperatures
+
+    first, second = await asyncio.wait_for(asyncio.gather(collect(), collect()), 2.0)
+    # separate polls would have split the temperature sequence between the subscribers
+    assert first == second == [20.0, 21.0, 22.0, 23.0, 24.0]
+    assert controller._change_feed.get_subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_change_window_coalesces_bursts():
+    controller = _controller([2000, 2100, 2200, 2200])
+
+    async with aclosing(controller.change_batches(window=0.1, min_interval=0.001,
+                                                  max_interval=0.001, jitter=0.0)) as batches:
+        async for batch in batches:
+            temperatures = [change.new for change in batch if change.parameter == "temperature"]
+            break
+
+    assert temperatures == [20.0, 21.0, 22.0]
+
+
+@pytest.mark.asyncio
+async def test_later_subscribers_cannot_change_scheduler_options():
+    controller = _controller(list(range(2000, 3000, 10)))
+
+    async with aclosing(controller.changes(min_interval=0.01, jitter=0.0)) as first:
+        await first.__anext__()
+        with pytest.raises(ValueError):
+            async with aclosing(controller.changes(min_interval=5.0)) as second:
+                await second.__anext__()
+        async with aclosing(controller.changes(min_interval=0.01, jitter=0.0)) as same:
+            assert (await same.__anext__()).parameter == "temperature"
+        async with aclosing(controller.changes()) as default:
+            assert (await default.__anext__()).parameter == "temperature"
+
+    async with aclosing(controller.changes(min_interval=5.0)) as alone:
+        await alone.__anext__()
+    assert controller._change_feed.get_scheduler()._min_interval == 5.0
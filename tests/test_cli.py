@@ -0,0 +1,62 @@
+import asyncio
+import io
+import json
+import pytest
+from pytouchline_extended.__main__ import _Output, parse_args, run
+from pytouchline_extended.emulator import TouchlineEmulator
+
+
+@pytest.mark.asyncio
+async def test_cli_streams_snapshots():
+    async with TouchlineEmulator(devices=3) as emulator:
+        stream = io.StringIO()
+        args = parse_args([emulator.get_url(), "--interval", "0.01", "--count", "2",
+                           "--transport", "streams"])
+        assert await run(args, stream) == 0
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(lines) == 6
+    assert [line["device"] for line in lines] == [0, 1, 2, 0, 1, 2]
+    assert lines[1]["controller"] == emulator.get_url()
+    assert lines[1]["name"] == "Room 1"
+    assert lines[1]["temperature"] == 20.1
+    assert "password" not in lines[1]
+
+
+@pytest.mark.asyncio
+async def test_cli_streams_changes():
+    async with TouchlineEmulator(devices=2) as emulator:
+        stream = io.StringIO()
+        args = parse_args([emulator.get_url(), "--interval", "0.01", "--count", "3", "--changes"])
+        assert await run(args, stream) == 0
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    # the first poll reports every value as a change from None, later polls nothing
+    assert all(line["old"] is None for line in lines)
+    assert "password" not in [line["parameter"] for line in lines]
+    assert {"controller": emulator.get_url(), "device": 1, "parameter": "setpoint",
+            "old": None, "new": 21.0} in [{k: v for k, v in line.items() if k != "time"} for line in lines]
+    assert len([line for line in lines if line["device"] == 0]) == len(lines) // 2
+
+
+@pytest.mark.asyncio
+async def test_cli_count_includes_failed_polls():
+    async with TouchlineEmulator(devices=1) as dead:
+        dead_url = dead.get_url()
+    async with TouchlineEmulator(devices=2) as emulator:
+        stream = io.StringIO()
+        args = parse_args([emulator.get_url(), dead_url, "--interval", "0.01", "--count", "2",
+                           "--transport", "streams"])
+        assert await asyncio.wait_for(run(args, stream), 5.0) == 1
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["device"] for line in lines] == [0, 1, 0, 1]
+    assert {line["controller"] for line in lines} == {emulator.get_url()}
+
+
+def test_cli_output_drops_oldest_when_full():
+    output = _Output(io.StringIO(), False, 2)
+    for number in range(5):
+        output._put({"n": number})
+    assert output.get_dropped() == 3
+    assert [json.loads(output._queue.get_nowait())["n"] for _ in range(2)] == [3, 4]
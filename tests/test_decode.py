@@ -0,0 +1,80 @@
+import pytest
+import xml.etree.ElementTree as ET
+from pytouchline_extended import PyTouchline, TouchlineSession, XmlItemDecoder, decode_items
+from unittest.mock import AsyncMock, patch, MagicMock
+
+
+RESPONSE = ('<?xml version="1.0" encoding="ISO-8859-1"?>'
+            '<body><version>1.0</version><item_list>'
+            '<i><n>G0.name</n><v>Køkken</v></i>'
+            '<i><n>G1.name</n><v>Soveværelse</v></i>'
+            '</item_list></body>')
+
+
+def test_decoder_emits_items_as_they_arrive():
+    content = RESPONSE.encode("utf-8")
+    split = content.index(b"<i><n>G1")
+    decoder = XmlItemDecoder("utf-8")
+
+    first = decoder.feed(content[:split])
+    assert [item.find("v").text for item in first] == ["Køkken"]
+
+    # split inside a multi-byte character
+    middle = content.index("æ".encode("utf-8")) + 1
+    assert decoder.feed(content[split:middle]) == []
+    second = decoder.feed(content[middle:]) + decoder.close()
+    assert [item.find("v").text for item in second] == ["Soveværelse"]
+    assert len(decoder.get_items()) == 2
+
+
+def test_decode_items_builds_item_list_only():
+    response = decode_items([RESPONSE.encode("latin-1")], "ISO-8859-1")
+    assert response.tag == "body"
+    assert response.find("version") is None
+    items = response.find("item_list").findall("i")
+    assert [item.find("v").text for item in items] == ["Køkken", "Soveværelse"]
+
+
+def test_decode_items_invalid():
+    with pytest.raises(ET.ParseError):
+        decode_items([b"<body><item_list>"], "utf-8")
+
+
+@pytest.mark.asyncio
+async def test_encoding_detected_once_per_session():
+    session = TouchlineSession(url="http://192.168.1.10")
+    touchline = PyTouchline(id=0, url="http://192.168.1.10", session=session)
+
+    mock_response = MagicMock()
+    mock_response.is_success = True
+    mock_response.content = RESPONSE.encode("latin-1")
+
+    with patch('httpx.AsyncClient') as mock_client, \
+            patch('cchardet.detect', return_value={"encoding": "ISO-8859-1"}) as detect:
+        mock_client.return_value.request = AsyncMock(return_value=mock_response)
+
+        await touchline.update_async()
+        await touchline.update_async()
+        assert detect.call_count == 1
+        assert session.get_encoding() == "ISO-8859-1"
+        assert touchline.get_name() == "Køkken"
+
+
+@pytest.mark.asyncio
+async def test_encoding_detected_again_when_cached_encoding_fails():
+    session = TouchlineSession(url="http://192.168.1.10")
+    session.set_encoding("ascii")
+    touchline = PyTouchline(id=0, url="http://192.168.1.10", session=session)
+
+    mock_response = MagicMock()
+    mock_response.is_success = True
+    mock_response.content = RESPONSE.encode("utf-8")
+
+    with patch('httpx.AsyncClient') as mock_client, \
+            patch('cchardet.detect', return_value={"encoding": "utf-8"}) as detect:
+        mock_client.return_value.request = AsyncMock(return_value=mock_response)
+
+        await touchline.update_async()
+        assert detect.call_count == 1
+        assert session.get_encoding() == "utf-8"
+        assert touchline.get_name() == "Køkken"
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from pytouchline_extended import PyTouchline, discover_async
+from unittest.mock import patch
+from pytouchline_extended.emulator import TouchlineEmulator
+
+
+async def _not_touchline(reader, writer):
+    await reader.readuntil(b"\r\n\r\n")
+    writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+    await writer.drain()
+    writer.close()
+
+
+def _port(url):
+    return int(url.rsplit(":", 1)[1])
+
+
+@pytest.mark.asyncio
+async def test_discover_hosts():
+    other = await asyncio.start_server(_not_touchline, "127.0.0.1", 0)
+    other_port = other.sockets[0].getsockname()[1]
+    async with TouchlineEmulator(devices=3, hostname="First") as first, \
+            TouchlineEmulator(devices=5, hostname="Second", latency=0.01) as second, \
+            TouchlineEmulator(devices=1, latency=1.0) as slow:
+        hosts = ["127.0.0.1:%d" % _port(first.get_url()),
+                 "127.0.0.1:%d" % other_port,
+                 "127.0.0.1:%d" % _port(slow.get_url()),
+                 "127.0.0.1:%d" % _port(second.get_url())]
+        controllers = await discover_async(hosts, concurrency=2, timeout=0.3)
+
+    other.close()
+    await other.wait_closed()
+    assert [(c.url, c.hostname, c.devices) for c in controllers] == [
+        ("http://" + hosts[0], "First", 3),
+        ("http://" + hosts[3], "Second", 5),
+    ]
+    assert controllers[1].latency >= 0.01
+
+
+@pytest.mark.asyncio
+async def test_discover_cidr():
+    async with TouchlineEmulator(devices=2) as emulator:
+        port = _port(emulator.get_url())
+        controllers = await discover_async("127.0.0.0/30", port=port, timeout=0.5)
+    assert [(c.url, c.devices) for c in controllers] == [("http://127.0.0.1:%d" % port, 2)]
+
+
+@pytest.mark.asyncio
+async def test_discover_does_not_hide_programming_errors():
+    async with TouchlineEmulator(devices=1) as emulator:
+        with patch.object(PyTouchline, "read_parameters_async", side_effect=AttributeError("bug")):
+            with pytest.raises(AttributeError):
+                await discover_async(["127.0.0.1:%d" % _port(emulator.get_url())])
@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from pytouchline_extended import PyTouchline, TouchlineSession, TouchlineError
+from pytouchline_extended.emulator import TouchlineEmulator
+
+
+@pytest.mark.asyncio
+async def test_emulator_read_and_write():
+    async with TouchlineEmulator(devices=3, hostname="Emulated") as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url) as session:
+            controller = PyTouchline(url=url, session=session)
+            assert await controller.get_number_of_devices_async() == 3
+            assert await controller.get_hostname_async() == "Emulated"
+            assert await controller.get_status_async() == "0"
+
+            devices = await controller.update_all_async()
+            assert [device.get_name() for device in devices] == ["Room 0", "Room 1", "Room 2"]
+            assert devices[2].get_current_temperature() == 20.2
+            assert devices[1].get_device_id() == 2
+
+            assert await devices[1].set_target_temperature_async(22.5)
+            assert emulator.get_value("G1.SollTemp") == "2250"
+            await devices[1].update_async()
+            assert devices[1].get_target_temperature() == 22.5
+
+        stats = emulator.get_stats()
+        assert stats["connections"] == 1
+        assert stats["reads"] == 6
+        assert stats["writes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_emulator_encoding():
+    async with TouchlineEmulator(devices=1, encoding="ISO-8859-1") as emulator:
+        emulator.set_value("G0.name", "Køkken")
+        device = PyTouchline(id=0, url=emulator.get_url(), session=TouchlineSession(url=emulator.get_url()))
+        await device.update_async()
+        assert device.get_name() == "Køkken"
+        await device.get_session().aclose()
+
+
+@pytest.mark.asyncio
+async def test_emulator_errors_and_item_limit():
+    async with TouchlineEmulator(devices=2, error_rate=1.0) as emulator:
+        device = PyTouchline(id=0, url=emulator.get_url(), session=TouchlineSession(url=emulator.get_url()))
+        with pytest.raises(TouchlineError, match="did not respond successfully"):
+            await device.update_async()
+        assert emulator.get_stats()["errors"] == 1
+        await device.get_session().aclose()
+
+    async with TouchlineEmulator(devices=2, max_items=10) as emulator:
+        url = emulator.get_url()
+        session = TouchlineSession(url=url)
+        with pytest.raises(TouchlineError):
+            await PyTouchline(url=url, session=session, max_items=20).update_all_async()
+        devices = await PyTouchline(url=url, session=session, max_items=10).update_all_async()
+        assert [device.get_name() for device in devices] == ["Room 0", "Room 1"]
+        await session.aclose()
+
+
+@pytest.mark.asyncio
+async def test_read_parameters_packs_requests():
+    async with TouchlineEmulator(devices=2, hostname="Emulated", max_items=3) as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url) as session:
+            controller = PyTouchline(url=url, session=session, max_items=3)
+            values = await controller.read_parameters_async(
+                ["hw.HostName", "G1.RaumTemp", "CD.upass", "R0.SystemStatus", "G7.RaumTemp",
+                 "hw.HostName"])
+        assert values == {"hw.HostName": "Emulated", "G1.RaumTemp": "2010", "CD.upass": "1234",
+                          "R0.SystemStatus": "0", "G7.RaumTemp": None}
+        assert emulator.get_stats()["reads"] == 2
+        # the requests are sent one after another over one connection
+        assert emulator.get_stats()["max_active_connections"] == 1
+
+
+@pytest.mark.asyncio
+async def test_read_parameters_without_max_items():
+    async with TouchlineEmulator(devices=1, hostname="Emulated") as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url) as session:
+            controller = PyTouchline(url=url, session=session, max_items=0)
+            values = await controller.read_parameters_async(["hw.HostName", "G0.RaumTemp"])
+        assert values == {"hw.HostName": "Emulated", "G0.RaumTemp": "2000"}
+        assert emulator.get_stats()["reads"] == 2
+
+
+@pytest.mark.asyncio
+async def test_emulator_latency_and_connection_limit():
+    async with TouchlineEmulator(devices=1, latency=0.02, max_connections=1,
+                                 keepalive_timeout=0.01) as emulator:
+        url = emulator.get_url()
+        sessions = [TouchlineSession(url=url) for _ in range(3)]
+        devices = [PyTouchline(id=0, url=url, session=session) for session in sessions]
+
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(device.update_async() for device in devices))
+        elapsed = asyncio.get_running_loop().time() - start
+
+        # the connections were served one after another
+        assert elapsed >= 0.06
+        assert emulator.get_stats()["connections"] == 3
+        assert emulator.get_stats()["max_active_connections"] == 1
+        for session in sessions:
+            await session.aclose()
@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+import xml.etree.ElementTree as ET
+from pytouchline_extended import TouchlineFleet, TouchlineConnectionError, TouchlineTimeoutError
+
+
+def _count_response(count):
+    return ET.fromstring(f"<body><item_list><i><n>totalNumberOfDevices</n><v>{count}</v></i></item_list></body>")
+
+
+def _devices_response(ids):
+    items = "".join(f"<i><n>G{id}.name</n><v>Room {id}</v><n>G{id}.RaumTemp</n><v>2000</v></i>" for id in ids)
+    return ET.fromstring(f"<body><item_list>{items}</item_list></body>")
+
+
+class Tracker(object):
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+
+def _install(fleet, url, count, delay=0.0, error=None, tracker=None):
+    async def request(body):
+        tracker.active += 1
+        tracker.max_active = max(tracker.max_active, tracker.active)
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            if b"totalNumberOfDevices" in body:
+                return _count_response(count)
+            return _devices_response(range(count))
+        finally:
+            tracker.active -= 1
+
+    tracker = tracker or Tracker()
+    fleet.get_controller(url)._request_and_receive_xml = request
+
+
+@pytest.mark.asyncio
+async def test_fleet_discover_and_poll():
+    fleet = TouchlineFleet(["http://10.0.0.1", "http://10.0.0.2"])
+    _install(fleet, "http://10.0.0.1", 2)
+    _install(fleet, "http://10.0.0.2", 3)
+
+    assert await fleet.discover() == {"http://10.0.0.1": 2, "http://10.0.0.2": 3}
+    devices = fleet.get_devices("http://10.0.0.2")
+    assert [device.get_id() for device in devices] == [0, 1, 2]
+    assert devices[0].get_session() is fleet.get_controller("http://10.0.0.2").get_session()
+
+    snapshot = await fleet.poll()
+    assert [state.name for state in snapshot["http://10.0.0.1"]] == ["Room 0", "Room 1"]
+    assert len(snapshot["http://10.0.0.2"]) == 3
+
+    stats = fleet.get_stats("http://10.0.0.1")
+    assert stats.requests == 2
+    assert stats.errors == 0
+    assert stats.get_mean_latency() is not None
+
+
+@pytest.mark.asyncio
+async def test_fleet_isolates_failing_and_slow_controllers():
+    fleet = TouchlineFleet(["http://10.0.0.1", "http://10.0.0.2", "http://10.0.0.3"], timeout=0.05)
+    _install(fleet, "http://10.0.0.1", 1)
+    _install(fleet, "http://10.0.0.2", 1, error=TouchlineConnectionError("refused"))
+    _install(fleet, "http://10.0.0.3", 1, delay=1.0)
+
+    snapshot = await asyncio.wait_for(fleet.poll(), 0.5)
+    assert snapshot["http://10.0.0.1"][0].name == "Room 0"
+    assert isinstance(snapshot["http://10.0.0.2"], TouchlineConnectionError)
+    assert isinstance(snapshot["http://10.0.0.3"], TouchlineTimeoutError)
+
+    all_stats = fleet.get_all_stats()
+    assert all_stats["http://10.0.0.2"]["errors"] == 1
+    assert all_stats["http://10.0.0.2"]["last_error"] == "refused"
+    assert all_stats["http://10.0.0.3"]["errors"] == 1
+    assert all_stats["http://10.0.0.1"]["errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_fleet_global_concurrency_limit():
+    urls = [f"http://10.0.0.{x}" for x in range(1, 7)]
+    fleet = TouchlineFleet(urls, max_concurrency=3)
+    tracker = Tracker()
+    for url in urls:
+        _install(fleet, url, 1, delay=0.01, tracker=tracker)
+
+    await fleet.discover()
+    assert tracker.max_active == 3
+
+
+@pytest.mark.asyncio
+async def test_fleet_per_host_limit():
+    urls = ["http://10.0.0.1:8001", "http://10.0.0.1:8002", "http://10.0.0.2"]
+    fleet = TouchlineFleet(urls, per_host_limit=1)
+    same_host = Tracker()
+    _install(fleet, urls[0], 1, delay=0.01, tracker=same_host)
+    _install(fleet, urls[1], 1, delay=0.01, tracker=same_host)
+    _install(fleet, urls[2], 1, delay=0.01)
+
+    await fleet.discover()
+    assert same_host.max_active == 1
+
+
+@pytest.mark.asyncio
+async def test_fleet_busy_host_does_not_starve_others():
+    busy = [f"http://10.0.0.1:{port}" for port in (8001, 8002, 8003)]
+    fleet = TouchlineFleet(busy + ["http://10.0.0.2"], max_concurrency=2, per_host_limit=1)
+    for url in busy:
+        _install(fleet, url, 1, delay=0.1)
+    _install(fleet, "http://10.0.0.2", 1)
+
+    discover = asyncio.ensure_future(fleet.discover())
+    try:
+        await asyncio.sleep(0.05)
+        # the queued URLs of the busy host must not hold the second global slot
+        assert fleet.get_stats("http://10.0.0.2").requests == 1
+        assert fleet.get_stats(busy[0]).requests == 0
+    finally:
+        await discover
@@ -0,0 +1,97 @@
+import pytest
+import xml.etree.ElementTree as ET
+from pytouchline_extended import PyTouchline, DeviceState, HistoryStore, RingBuffer
+from unittest.mock import AsyncMock, patch
+
+
+def _state(temperature, setpoint=None):
+    state = DeviceState(0)
+    state.temperature = temperature
+    state.setpoint = setpoint
+    return state
+
+
+def test_ring_buffer_wraps():
+    ring = RingBuffer(3)
+    assert ring.last() is None
+    assert ring.nbytes() == 18
+    for timestamp, value in ((10, 2000), (20, 2000), (30, 2100), (40, 2200)):
+        ring.append(timestamp, value)
+    assert len(ring) == 3
+    assert ring.last() == (40, 2200)
+    assert list(ring.iter_since(0)) == [(40, 2200), (30, 2100), (20, 2000)]
+    assert list(ring.iter_since(30)) == [(40, 2200), (30, 2100)]
+    assert ring.summary(0) == (2000, 2200, 6300, 3)
+    assert ring.summary(50) is None
+
+
+def test_ring_buffer_last_change():
+    ring = RingBuffer(4)
+    ring.append(10, 2000)
+    assert ring.last_change() == 10
+    ring.append(20, 2000)
+    assert ring.last_change() == 10
+    ring.append(30, 1990)
+    assert ring.last_change() == 30
+
+
+def test_history_store_queries():
+    history = HistoryStore(samples=10, max_series=4)
+    key = ("http://10.0.0.1", 0)
+    for timestamp, temperature in ((100, 20.0), (160, 20.5), (220, 21.0), (280, 21.0)):
+        history.record(key, _state(temperature, 22.0), timestamp)
+
+    assert history.last(key, "temperature") == (280, 21.0)
+    assert history.last_change(key, "temperature") == 220
+    assert history.last_change(key, "setpoint") == 100
+    assert history.min(key, "temperature") == 20.0
+    assert history.max(key, "temperature") == 21.0
+    assert history.mean(key, "temperature") == pytest.approx(20.625)
+    assert history.summary(key, "temperature", window=60, now=280) == \
+        {"min": 21.0, "max": 21.0, "mean": 21.0, "count": 2}
+    assert history.summary(key, "temperature", window=10, now=1000) is None
+    assert history.last(("http://10.0.0.1", 1), "temperature") is None
+
+
+def test_history_store_memory_cap():
+    history = HistoryStore(samples=1000, max_series=2)
+    assert history.get_memory_limit() == 12000
+    history.record(("a", 0), _state(20.0, 21.0), 1)
+    history.record(("a", 1), _state(20.0, 21.0), 1)
+    assert history.get_series(("a", 1), "temperature") is None
+    assert history.get_memory_usage() == 12000
+
+    # a refused series does not stop the values of series that already exist
+    history = HistoryStore(samples=3, max_series=1)
+    history.record(("a", 0), _state(None, 20.0), 1)
+    history.record(("a", 0), _state(21.0, 20.5), 2)
+    assert history.get_series(("a", 0), "temperature") is None
+    assert history.last(("a", 0), "setpoint") == (2, 20.5)
+
+
+def test_history_store_skips_missing_and_clamps():
+    history = HistoryStore(samples=4, max_series=4)
+    history.record(("a", 0), _state(None, 500.0), 1)
+    assert history.get_series(("a", 0), "temperature") is None
+    assert history.last(("a", 0), "setpoint") == (1, 327.67)
+
+
+@pytest.mark.asyncio
+async def test_updates_feed_history():
+    history = HistoryStore(samples=10, max_series=10)
+    controller = PyTouchline(url="http://10.0.0.1", history=history)
+    responses = [
+        ET.fromstring("<body><item_list><i><n>totalNumberOfDevices</n><v>2</v></i></item_list></body>"),
+        ET.fromstring("<body><item_list>"
+                      "<i><n>G0.RaumTemp</n><v>2050</v><n>G0.SollTemp</n><v>2100</v></i>"
+                      "<i><n>G1.RaumTemp</n><v>1900</v></i>"
+                      "</item_list></body>"),
+    ]
+
+    with patch.object(controller, '_request_and_receive_xml', new_callable=AsyncMock) as mock_request:
+        mock_request.side_effect = responses
+        await controller.update_all_async()
+
+    assert history.last(("http://10.0.0.1", 0), "temperature")[1] == 20.5
+    assert history.last(("http://10.0.0.1", 0), "setpoint")[1] == 21.0
+    assert history.last(("http://10.0.0.1", 1), "temperature")[1] == 19.0
@@ -0,0 +1,129 @@
+import asyncio
+import httpx
+import pytest
+from pytouchline_extended import (PyTouchline, TouchlineSession, Histogram, HistogramCollector,
+                                  Instrumentation, PrometheusExporter)
+from pytouchline_extended.emulator import TouchlineEmulator
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+class Recorder(Instrumentation):
+    def __init__(self):
+        self.metrics = []
+
+    def on_request(self, metrics):
+        self.metrics.append(metrics)
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.get_cumulative_counts() == [2, 3, 4]
+    assert histogram.get_count() == 4
+    assert histogram.get_sum() == pytest.approx(2.65)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.99) == float("inf")
+    assert Histogram((1.0,)).quantile(0.5) is None
+
+
+def test_no_metrics_without_instrumentation():
+    session = TouchlineSession(url="http://192.168.1.40")
+    assert session.start_metrics("read") is None
+
+
+@pytest.mark.asyncio
+async def test_read_and_write_metrics_against_emulator():
+    recorder = Recorder()
+    async with TouchlineEmulator(devices=2) as emulator:
+        async with TouchlineSession(url=emulator.get_url()) as session:
+            session.add_instrumentation(recorder)
+            device = PyTouchline(id=1, url=emulator.get_url(), session=session)
+            await device.update_async()
+            await device.update_async()
+            await device.set_operation_mode_async(1)
+
+    first, second, write = recorder.metrics
+    assert first.kind == "read"
+    assert first.url == emulator.get_url()
+    assert first.connect_time is not None
+    assert second.connect_time is None
+    for metrics in (first, second):
+        assert 0 < metrics.time_to_first_byte <= metrics.http_time
+        assert metrics.bytes_out > 0
+        assert metrics.bytes_in > 0
+        assert metrics.parse_time is not None
+        assert metrics.error is None
+    assert first.detect_time is not None
+    assert second.detect_time is None
+
+    assert write.kind == "write"
+    assert write.bytes_in == 1
+    assert write.http_time is not None
+
+
+@pytest.mark.asyncio
+async def test_hedged_read_reports_the_answering_attempt():
+    recorder = Recorder()
+    session = TouchlineSession(url="http://192.168.1.40", hedge_reads=True, hedge_min_samples=5)
+    session.add_instrumentation(recorder)
+    for _ in range(5):
+        session._read_latencies.add(0.05)
+    device = PyTouchline(id=0, url="http://192.168.1.40", session=session)
+    requests = []
+
+    async def second_request_stalls(**kwargs):
+        requests.append(kwargs)
+        await asyncio.sleep(0.15 if len(requests) == 1 else 1.0)
+        response = MagicMock()
+        response.is_success = True
+        response.content = b"<body><item_list><i><n>hw.HostName</n><v>Touchline</v></i></item_list></body>"
+        return response
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=second_request_stalls)
+        assert await device.get_hostname_async() == "Touchline"
+
+    assert len(requests) == 2
+    [metrics] = recorder.metrics
+    # the second attempt started later and was cancelled, it must not shorten the first's time
+    assert metrics.http_time >= 0.14
+    assert metrics.bytes_in > 0
+    assert metrics.parse_time is not None
+
+
+@pytest.mark.asyncio
+async def test_error_class_is_reported():
+    recorder = Recorder()
+    session = TouchlineSession(url="http://192.168.1.40")
+    session.add_instrumentation(recorder)
+    device = PyTouchline(id=0, url="http://192.168.1.40", session=session)
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=httpx.ConnectTimeout("timeout"))
+        with pytest.raises(Exception):
+            await device.update_async()
+
+    assert recorder.metrics[0].error == "ConnectTimeout"
+    assert recorder.metrics[0].http_time is not None
+
+
+@pytest.mark.asyncio
+async def test_collector_and_prometheus_export():
+    collector = HistogramCollector()
+    async with TouchlineEmulator(devices=1) as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url) as session:
+            session.add_instrumentation(collector)
+            device = PyTouchline(id=0, url=url, session=session)
+            for _ in range(3):
+                await device.update_async()
+
+    assert collector.get_histogram(url, "read", "http_time").get_count() == 3
+    assert collector.get_counters(url, "read")["requests"] == 3
+
+    text = PrometheusExporter(collector).render()
+    assert f'touchline_requests_total{{controller="{url}",kind="read"}} 3' in text
+    assert f'touchline_request_phase_seconds_count{{controller="{url}",kind="read",phase="http_time"}} 3' in text
+    assert f'touchline_request_phase_seconds_bucket{{controller="{url}",kind="read",phase="http_time",le="+Inf"}} 3' in text
+    assert "# TYPE touchline_request_phase_seconds histogram" in text
@@ -1,5 +1,6 @@
 import pytest
 from pytouchline_extended import PyTouchline, Parameter
+from pytouchline_extended.request import device_request
 from unittest.mock import AsyncMock, patch, MagicMock
 import xml.etree.ElementTree as ET
 
@@ -28,18 +29,16 @@ def test_init_custom_timeout():
 
 def test_get_touchline_request():
     touchline = PyTouchline(id=0, url="http://192.168.1.254")
-    items = ["<i><n>test</n></i>"]
+    items = ["<i><n>test</n></i>", b"<i><n>other</n></i>"]
     request = touchline._get_touchline_request(items)
 
-    assert "<body>" in request
-    assert "<version>1.0</version>" in request
-    assert "<client>IMaster6_02_00</client>" in request
-    assert "<client_ver>6.02.0006</client_ver>" in request
-    assert "<file_name>room</file_name>" in request
-    assert "<item_list>" in request
-    assert "<i><n>test</n></i>" in request
-    assert "</item_list>" in request
-    assert "</body>" in request
+    assert request.startswith(b"<body>")
+    assert b"<version>1.0</version>" in request
+    assert b"<client>IMaster6_02_00</client>" in request
+    assert b"<client_ver>6.02.0006</client_ver>" in request
+    assert b"<file_name>room</file_name>" in request
+    assert b"<item_list><i><n>test</n></i><i><n>other</n></i></item_list>" in request
+    assert request.endswith(b"</body>")
 
 
 def test_get_touchline_device_item():
@@ -47,12 +46,22 @@ def test_get_touchline_device_item():
     items = touchline._get_touchline_device_item(5)
 
     assert len(items) == 1
-    assert "<i>" in items[0]
-    assert "</i>" in items[0]
-    assert "<n>G5.name</n>" in items[0]
-    assert "<n>G5.SollTemp</n>" in items[0]
-    assert "<n>G5.RaumTemp</n>" in items[0]
-    assert "<n>CD.upass</n>" in items[0]
+    assert items[0].startswith(b"<i>")
+    assert items[0].endswith(b"</i>")
+    assert b"<n>G5.name</n>" in items[0]
+    assert b"<n>G5.SollTemp</n>" in items[0]
+    assert b"<n>G5.RaumTemp</n>" in items[0]
+    assert b"<n>CD.upass</n>" in items[0]
+
+
+def test_device_requests_are_cached():
+    first = PyTouchline(id=5, url="http://192.168.1.254")
+    second = PyTouchline(id=5, url="http://192.168.1.254")
+
+    assert first._get_touchline_device_item(5)[0] is second._get_touchline_device_item(5)[0]
+    assert device_request((5,), first._xml_parameters) is device_request((5,), second._xml_parameters)
+    assert device_request((5,), first._xml_parameters) == \
+        first._get_touchline_request(first._get_touchline_device_item(5))
 
 
 def test_parse_number_of_devices():
@@ -72,6 +81,26 @@ def test_parse_number_of_devices():
     assert result == "5"
 
 
+def test_parse_values():
+    touchline = PyTouchline(id=0, url="http://192.168.1.254")
+    xml_response = ET.fromstring("""
+        <body>
+            <item_list>
+                <i>
+                    <n>hw.HostName</n>
+                    <v>Touchline</v>
+                    <n>G9.RaumTemp</n>
+                    <n>R0.SystemStatus</n>
+                    <v>0</v>
+                </i>
+            </item_list>
+        </body>
+    """)
+
+    assert touchline._parse_values(xml_response) == \
+        {"hw.HostName": "Touchline", "G9.RaumTemp": None, "R0.SystemStatus": "0"}
+
+
 def test_parse_device():
     touchline = PyTouchline(id=0, url="http://192.168.1.254")
     xml_response = ET.fromstring("""
@@ -104,11 +133,16 @@ def test_parse_device():
     """)
 
     touchline._parse_device(xml_response)
-    assert touchline._parameter["Name"] == "Living Room"
-    assert touchline._parameter["Temperature"] == "2150"
-    assert touchline._parameter["Setpoint"] == "2200"
-    assert touchline._parameter["Device ID"] == "1"
-    assert touchline._parameter["Controller ID"] == "100"
+    state = touchline.get_state()
+    assert state.unique_id == 0
+    assert state.name == "Living Room"
+    assert state.password == "password"
+    assert state.temperature == 21.5
+    assert state.setpoint == 22.0
+    assert state.setpoint_max == 30.0
+    assert state.operation_mode == 1
+    assert state.device_id == 1
+    assert state.controller_id == 100
 
 
 def test_get_name():
@@ -118,7 +152,7 @@ def test_get_name():
     assert touchline.get_name() is None
 
     # Test when name exists
-    touchline._parameter["Name"] = "Kitchen"
+    touchline._state.set_value("name", "Kitchen", touchline._temp_scale)
     assert touchline.get_name() == "Kitchen"
 
 
@@ -129,7 +163,7 @@ def test_get_current_temperature():
     assert touchline.get_current_temperature() is None
 
     # Test when temperature exists (2150 = 21.50°C)
-    touchline._parameter["Temperature"] = "2150"
+    touchline._state.set_value("RaumTemp", "2150", touchline._temp_scale)
     assert touchline.get_current_temperature() == 21.5
 
 
@@ -140,7 +174,7 @@ def test_get_target_temperature():
     assert touchline.get_target_temperature() is None
 
     # Test when setpoint exists (2200 = 22.00°C)
-    touchline._parameter["Setpoint"] = "2200"
+    touchline._state.set_value("SollTemp", "2200", touchline._temp_scale)
     assert touchline.get_target_temperature() == 22.0
 
 
@@ -149,7 +183,7 @@ def test_get_target_temperature_high():
 
     assert touchline.get_target_temperature_high() is None
 
-    touchline._parameter["Setpoint max"] = "3000"
+    touchline._state.set_value("SollTempMaxVal", "3000", touchline._temp_scale)
     assert touchline.get_target_temperature_high() == 30.0
 
 
@@ -158,7 +192,7 @@ def test_get_target_temperature_low():
 
     assert touchline.get_target_temperature_low() is None
 
-    touchline._parameter["Setpoint min"] = "500"
+    touchline._state.set_value("SollTempMinVal", "500", touchline._temp_scale)
     assert touchline.get_target_temperature_low() == 5.0
 
 
@@ -167,7 +201,7 @@ def test_get_week_program():
 
     assert touchline.get_week_program() is None
 
-    touchline._parameter["Week program"] = "2"
+    touchline._state.set_value("WeekProg", "2", touchline._temp_scale)
     assert touchline.get_week_program() == 2
 
 
@@ -176,7 +210,7 @@ def test_get_operation_mode():
 
     assert touchline.get_operation_mode() is None
 
-    touchline._parameter["Operation mode"] = "1"
+    touchline._state.set_value("OPMode", "1", touchline._temp_scale)
     assert touchline.get_operation_mode() == 1
 
 
@@ -185,7 +219,7 @@ def test_get_device_id():
 
     assert touchline.get_device_id() is None
 
-    touchline._parameter["Device ID"] = "5"
+    touchline._state.set_value("kurzID", "5", touchline._temp_scale)
     assert touchline.get_device_id() == 5
 
 
@@ -194,7 +228,7 @@ def test_get_controller_id():
 
     assert touchline.get_controller_id() is None
 
-    touchline._parameter["Controller ID"] = "10"
+    touchline._state.set_value("ownerKurzID", "10", touchline._temp_scale)
     assert touchline.get_controller_id() == 10
 
 
@@ -325,7 +359,7 @@ async def test_request_and_receive_xml_empty_response():
     mock_response.content = b""  # Empty response
 
     with patch('httpx.AsyncClient') as mock_client:
-        mock_client.return_value.__aenter__.return_value.request = AsyncMock(return_value=mock_response)
+        mock_client.return_value.request = AsyncMock(return_value=mock_response)
 
         with pytest.raises(Exception, match="Touchline controller returned empty response"):
             await touchline._request_and_receive_xml("<test/>")
@@ -341,7 +375,7 @@ async def test_request_and_receive_xml_invalid_xml():
     mock_response.content = b"This is not XML"
 
     with patch('httpx.AsyncClient') as mock_client:
-        mock_client.return_value.__aenter__.return_value.request = AsyncMock(return_value=mock_response)
+        mock_client.return_value.request = AsyncMock(return_value=mock_response)
 
         with pytest.raises(Exception, match="Invalid XML response from Touchline controller"):
             await touchline._request_and_receive_xml("<test/>")
@@ -354,7 +388,7 @@ async def test_request_and_receive_xml_timeout():
     touchline = PyTouchline(id=0, url="http://192.168.1.254", timeout=5.0)
 
     with patch('httpx.AsyncClient') as mock_client:
-        mock_client.return_value.__aenter__.return_value.request = AsyncMock(
+        mock_client.return_value.request = AsyncMock(
             side_effect=httpx.TimeoutException("Connection timeout")
         )
 
@@ -369,9 +403,156 @@ async def test_request_and_receive_xml_network_error():
     touchline = PyTouchline(id=0, url="http://192.168.1.254")
 
     with patch('httpx.AsyncClient') as mock_client:
-        mock_client.return_value.__aenter__.return_value.request = AsyncMock(
+        mock_client.return_value.request = AsyncMock(
             side_effect=httpx.ConnectError("Connection refused")
         )
 
         with pytest.raises(Exception, match="Network error connecting to Touchline controller"):
             await touchline._request_and_receive_xml("<test/>")
+
+
+def _device_item_xml(id, name, temperature):
+    return f"""
+                <i>
+                    <n>G{id}.name</n>
+                    <v>{name}</v>
+                    <n>CD.upass</n>
+                    <v>password</v>
+                    <n>G{id}.SollTempMaxVal</n>
+                    <v>3000</v>
+                    <n>G{id}.SollTempMinVal</n>
+                    <v>500</v>
+                    <n>G{id}.WeekProg</n>
+                    <v>0</v>
+                    <n>G{id}.OPMode</n>
+                    <v>1</v>
+                    <n>G{id}.SollTemp</n>
+                    <v>2100</v>
+                    <n>G{id}.RaumTemp</n>
+                    <v>{temperature}</v>
+                    <n>G{id}.kurzID</n>
+                    <v>{id + 1}</v>
+                    <n>G{id}.ownerKurzID</n>
+                    <v>100</v>
+                </i>"""
+
+
+def test_chunk_device_ids():
+    touchline = PyTouchline(url="http://192.168.1.254", max_items=25)
+    assert touchline._chunk_device_ids([0, 1, 2, 3, 4]) == [[0, 1], [2, 3], [4]]
+
+    touchline = PyTouchline(url="http://192.168.1.254", max_items=5)
+    assert touchline._chunk_device_ids([0, 1]) == [[0], [1]]
+
+
+@pytest.mark.asyncio
+async def test_update_all_async_single_request():
+    touchline = PyTouchline(url="http://192.168.1.254")
+    devices = [PyTouchline(id=x, url="http://192.168.1.254") for x in range(2)]
+
+    mock_response = ET.fromstring("<body><item_list>" +
+                                  _device_item_xml(0, "Kitchen", 2050) +
+                                  _device_item_xml(1, "Bedroom", 1900) +
+                                  "</item_list></body>")
+
+    with patch.object(touchline, '_request_and_receive_xml', new_callable=AsyncMock) as mock_request:
+        mock_request.return_value = mock_response
+        result = await touchline.update_all_async(devices)
+
+        assert mock_request.call_count == 1
+        request = mock_request.call_args[0][0]
+        assert b"<n>G0.name</n>" in request
+        assert b"<n>G1.name</n>" in request
+
+    assert result is devices
+    assert devices[0].get_name() == "Kitchen"
+    assert devices[0].get_current_temperature() == 20.5
+    assert devices[1].get_name() == "Bedroom"
+    assert devices[1].get_current_temperature() == 19.0
+
+
+@pytest.mark.asyncio
+async def test_update_all_async_discovers_devices_and_chunks():
+    touchline = PyTouchline(url="http://192.168.1.254", max_items=10)
+
+    responses = [
+        ET.fromstring("<body><item_list><i><n>totalNumberOfDevices</n><v>2</v></i></item_list></body>"),
+        ET.fromstring("<body><item_list>" + _device_item_xml(0, "Kitchen", 2050) + "</item_list></body>"),
+        ET.fromstring("<body><item_list>" + _device_item_xml(1, "Bedroom", 1900) + "</item_list></body>"),
+    ]
+
+    with patch.object(touchline, '_request_and_receive_xml', new_callable=AsyncMock) as mock_request:
+        mock_request.side_effect = responses
+        devices = await touchline.update_all_async()
+
+        assert mock_request.call_count == 3
+
+    assert [device._id for device in devices] == [0, 1]
+    assert devices[0].get_name() == "Kitchen"
+    assert devices[1].get_name() == "Bedroom"
+
+
+def test_parse_device_any_order_missing_and_extra_fields():
+    touchline = PyTouchline(id=2, url="http://192.168.1.254")
+    xml_response = ET.fromstring("""
+        <body>
+            <item_list>
+                <i>
+                    <n>G2.RaumTemp</n>
+                    <v>2150</v>
+                    <n>G2.unknownField</n>
+                    <v>42</v>
+                    <n>G2.SollTemp</n>
+                    <n>G2.name</n>
+                    <v>Hall</v>
+                    <n>CD.upass</n>
+                    <v>secret</v>
+                </i>
+            </item_list>
+        </body>
+    """)
+
+    touchline._parse_device(xml_response)
+    state = touchline.get_state()
+    assert state.unique_id == 2
+    assert state.temperature == 21.5
+    assert state.setpoint is None
+    assert state.name == "Hall"
+    assert state.password == "secret"
+    assert state.operation_mode is None
+
+
+def test_parse_devices_multiple_devices_in_one_item():
+    touchline = PyTouchline(url="http://192.168.1.254")
+    xml_response = ET.fromstring("""
+        <body>
+            <item_list>
+                <i>
+                    <n>CD.upass</n>
+                    <v>secret</v>
+                    <n>G0.name</n>
+                    <v>Kitchen</v>
+                    <n>G1.name</n>
+                    <v>Bedroom</v>
+                    <n>G1.RaumTemp</n>
+                    <v>1900</v>
+                </i>
+            </item_list>
+        </body>
+    """)
+
+    devices = touchline._parse_devices(xml_response)
+    assert sorted(devices) == [0, 1]
+    assert devices[0].name == "Kitchen"
+    assert devices[1].name == "Bedroom"
+    assert devices[1].temperature == 19.0
+    assert devices[0].password == devices[1].password == "secret"
+
+
+def test_parse_device_ignores_other_devices():
+    touchline = PyTouchline(id=1, url="http://192.168.1.254")
+    xml_response = ET.fromstring(
+        "<body><item_list><i><n>G0.name</n><v>Kitchen</v></i></item_list></body>")
+
+    touchline._parse_device(xml_response)
+    assert touchline.get_name() is None
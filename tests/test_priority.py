@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from pytouchline_extended import (PyTouchline, Priority, RequestQueue, StaleRequestError,
+                                  TouchlineSession, request_priority)
+from pytouchline_extended.emulator import TouchlineEmulator
+
+
+@pytest.mark.asyncio
+async def test_queue_serves_by_priority_then_arrival():
+    queue = RequestQueue(concurrency=1)
+    release = asyncio.Event()
+    order = []
+
+    def attempt(name, wait=None):
+        async def run():
+            if wait is not None:
+                await wait.wait()
+            order.append(name)
+        return run
+
+    first = asyncio.create_task(queue.run(Priority.POLL, attempt("first", release)))
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(queue.run(priority, attempt(name)))
+             for priority, name in ((Priority.POLL, "poll 1"), (Priority.READ, "read"),
+                                    (Priority.POLL, "poll 2"), (Priority.WRITE, "write"))]
+    await asyncio.sleep(0)
+    assert queue.get_active() == 1
+    assert queue.get_waiting() == 4
+    release.set()
+    await asyncio.gather(first, *tasks)
+    assert order == ["first", "write", "read", "poll 1", "poll 2"]
+
+
+@pytest.mark.asyncio
+async def test_queue_drops_stale_polls_and_skips_cancelled():
+    now = [0.0]
+    queue = RequestQueue(concurrency=1, max_poll_wait=5.0, clock=lambda: now[0])
+    release = asyncio.Event()
+
+    async def blocked():
+        await release.wait()
+
+    async def done():
+        return "done"
+
+    first = asyncio.create_task(queue.run(Priority.READ, blocked))
+    await asyncio.sleep(0)
+    poll = asyncio.create_task(queue.run(Priority.POLL, done))
+    cancelled = asyncio.create_task(queue.run(Priority.WRITE, done))
+    read = asyncio.create_task(queue.run(Priority.READ, done))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    now[0] = 10.0
+    release.set()
+
+    assert await read == "done"
+    with pytest.raises(StaleRequestError):
+        await poll
+    await first
+    assert queue.get_stale_count() == 1
+    assert queue.get_active() == 0
+    assert await queue.run(Priority.POLL, done) == "done"
+
+
+@pytest.mark.asyncio
+async def test_writes_preempt_polls():
+    async with TouchlineEmulator(devices=6, latency=0.02) as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url, max_requests=1) as session:
+            devices = [PyTouchline(id=x, url=url, session=session) for x in range(6)]
+            finished = []
+
+            async def poll(device):
+                with request_priority(Priority.POLL):
+                    await device.update_async()
+                finished.append(device.get_id())
+
+            async def write():
+                await devices[0].set_target_temperature_async(22.0)
+                finished.append("write")
+
+            polls = [asyncio.create_task(poll(device)) for device in devices]
+            await asyncio.sleep(0.01)
+            await asyncio.gather(write(), *polls)
+
+        assert finished.index("write") <= 1
+        assert emulator.get_stats()["max_active_connections"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reads_do_not_join_queued_polls():
+    async with TouchlineEmulator(devices=1, latency=0.1) as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url, max_requests=1, max_poll_wait=0.05) as session:
+            controller = PyTouchline(url=url, session=session)
+
+            async def poll():
+                with request_priority(Priority.POLL):
+                    return await controller.get_number_of_devices_async()
+
+            busy = asyncio.create_task(controller.get_hostname_async())
+            await asyncio.sleep(0.01)
+            polled = asyncio.create_task(poll())
+            await asyncio.sleep(0.01)
+            assert await controller.get_number_of_devices_async() == 1
+            with pytest.raises(StaleRequestError):
+                await polled
+            await busy
@@ -0,0 +1,151 @@
+import asyncio
+import httpx
+import pytest
+from pytouchline_extended import (PyTouchline, TouchlineSession, CircuitBreaker, CircuitOpenError,
+                                  RetryPolicy, TouchlineConnectionError, TouchlineError)
+from pytouchline_extended.resilience import LatencyWindow, hedged
+from unittest.mock import AsyncMock, patch, MagicMock
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _xml_response():
+    response = MagicMock()
+    response.is_success = True
+    response.content = b"<body><item_list><i><n>hw.HostName</n><v>Touchline</v></i></item_list></body>"
+    return response
+
+
+def test_retry_policy():
+    policy = RetryPolicy(attempts=3, backoff=0.1, max_backoff=0.3, jitter=0.0)
+    assert policy.should_retry(TouchlineConnectionError("down"), 1)
+    assert policy.should_retry(TouchlineConnectionError("down"), 2)
+    assert not policy.should_retry(TouchlineConnectionError("down"), 3)
+    assert not policy.should_retry(TouchlineError("bad xml"), 1)
+    assert not policy.should_retry(CircuitOpenError("open"), 1)
+    assert [policy.get_delay(attempt) for attempt in (1, 2, 3)] == [0.1, 0.2, 0.3]
+    assert not RetryPolicy().should_retry(TouchlineConnectionError("down"), 1)
+
+
+def test_circuit_breaker_states():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.get_state() == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.get_state() == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    # one probe after the reset timeout, others still fail fast
+    clock.now = 10
+    breaker.before_request()
+    assert breaker.get_state() == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_failure()
+    assert breaker.get_state() == CircuitBreaker.OPEN
+
+    clock.now = 20
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.get_state() == CircuitBreaker.CLOSED
+    assert breaker.get_failures() == 0
+
+
+def test_latency_window():
+    window = LatencyWindow(size=100)
+    assert window.quantile(0.95) is None
+    for latency in range(1, 101):
+        window.add(latency / 100)
+    assert window.quantile(0.95) == 0.96
+    assert len(window) == 100
+
+
+@pytest.mark.asyncio
+async def test_reads_are_retried():
+    session = TouchlineSession(url="http://192.168.1.50",
+                               read_retry=RetryPolicy(attempts=3, backoff=0.001))
+    device = PyTouchline(id=0, url="http://192.168.1.50", session=session)
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(
+            side_effect=[httpx.ConnectError("refused"), httpx.ReadTimeout("slow"), _xml_response()])
+        assert await device.get_hostname_async() == "Touchline"
+        assert mock_client.return_value.request.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_writes_use_their_own_policy():
+    session = TouchlineSession(url="http://192.168.1.50",
+                               read_retry=RetryPolicy(attempts=3, backoff=0.001))
+    device = PyTouchline(id=0, url="http://192.168.1.50", session=session)
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=httpx.ConnectError("refused"))
+        with pytest.raises(TouchlineConnectionError):
+            await device.set_operation_mode_async(1)
+        assert mock_client.return_value.request.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    session = TouchlineSession(url="http://192.168.1.50", circuit_breaker=breaker)
+    device = PyTouchline(id=0, url="http://192.168.1.50", session=session)
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=httpx.ConnectError("refused"))
+        for _ in range(2):
+            with pytest.raises(TouchlineConnectionError, match="Network error"):
+                await device.get_status_async()
+        with pytest.raises(CircuitOpenError):
+            await device.get_status_async()
+        assert mock_client.return_value.request.call_count == 2
+        assert session.get_circuit_breaker() is breaker
+
+
+@pytest.mark.asyncio
+async def test_hedged_helper_returns_first_success():
+    calls = []
+
+    async def attempt():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+            return "slow"
+        return "fast"
+
+    assert await asyncio.wait_for(hedged(attempt, 0.01), 0.5) == "fast"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_hedged_reads():
+    session = TouchlineSession(url="http://192.168.1.50", hedge_reads=True, hedge_min_samples=5)
+    device = PyTouchline(id=0, url="http://192.168.1.50", session=session)
+    assert session.get_hedge_delay() is None
+    for _ in range(5):
+        session._read_latencies.add(0.01)
+    assert session.get_hedge_delay() == 0.01
+
+    requests = []
+
+    async def first_request_stalls(**kwargs):
+        requests.append(kwargs)
+        if len(requests) == 1:
+            await asyncio.sleep(1)
+        return _xml_response()
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=first_request_stalls)
+        assert await asyncio.wait_for(device.get_hostname_async(), 0.5) == "Touchline"
+        assert len(requests) == 2
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+import xml.etree.ElementTree as ET
+from pytouchline_extended import PyTouchline, BackgroundLoop, run_sync
+from unittest.mock import AsyncMock, patch
+
+
+async def _current_loop():
+    return asyncio.get_running_loop()
+
+
+def test_run_sync_reuses_loop():
+    first = run_sync(_current_loop())
+    second = run_sync(_current_loop())
+    assert first is second
+    assert first is BackgroundLoop.get().get_loop()
+
+
+def test_run_sync_propagates_exceptions():
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        run_sync(fail())
+
+
+def test_run_sync_from_background_loop():
+    async def nested():
+        return run_sync(_current_loop())
+
+    with pytest.raises(RuntimeError, match="background loop"):
+        run_sync(nested())
+
+
+@pytest.mark.asyncio
+async def test_sync_api_inside_running_loop():
+    touchline = PyTouchline(id=0, url="http://192.168.1.254")
+
+    mock_response = ET.fromstring("""
+        <body>
+            <item_list>
+                <i>
+                    <n>totalNumberOfDevices</n>
+                    <v>4</v>
+                </i>
+            </item_list>
+        </body>
+    """)
+
+    with patch.object(touchline, '_request_and_receive_xml', new_callable=AsyncMock) as mock_request:
+        mock_request.return_value = mock_response
+        assert touchline.get_number_of_devices() == 4
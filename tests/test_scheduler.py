@@ -0,0 +1,141 @@
+import asyncio
+import time
+import pytest
+import xml.etree.ElementTree as ET
+from pytouchline_extended import PyTouchline, PollScheduler, StaleRequestError, TouchlineConnectionError
+
+
+class FakeController(object):
+    """Answers the requests of a one device controller from a list of temperatures."""
+
+    def __init__(self, temperatures, errors=None):
+        self.temperatures = list(temperatures)
+        self.errors = list(errors or [])
+        self.requests = 0
+
+    async def __call__(self, request):
+        if b"totalNumberOfDevices" in request:
+            return ET.fromstring("<body><item_list><i><n>totalNumberOfDevices</n><v>1</v></i></item_list></body>")
+        self.requests += 1
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        temperature = self.temperatures.pop(0) if len(self.temperatures) > 1 else self.temperatures[0]
+        return ET.fromstring("<body><item_list><i><n>G0.name</n><v>Kitchen</v>"
+                             f"<n>G0.RaumTemp</n><v>{temperature}</v></i></item_list></body>")
+
+
+def _controller(fake):
+    controller = PyTouchline(url="http://192.168.1.20")
+    controller._request_and_receive_xml = fake
+    return controller
+
+
+@pytest.mark.asyncio
+async def test_interval_grows_while_stable_and_resets_on_change():
+    controller = _controller(FakeController([2000, 2000, 2000, 2100]))
+    scheduler = PollScheduler([controller], min_interval=1.0, max_interval=3.0,
+                              growth=2.0, jitter=0.0)
+
+    assert await scheduler.poll_now(controller) == 1.0
+    assert await scheduler.poll_now(controller) == 2.0
+    assert await scheduler.poll_now(controller) == 3.0
+    assert await scheduler.poll_now(controller) == 1.0
+    assert scheduler.get_devices(controller)[0].get_current_temperature() == 21.0
+
+
+@pytest.mark.asyncio
+async def test_polls_fast_after_write():
+    controller = _controller(FakeController([2000]))
+    scheduler = PollScheduler([controller], min_interval=1.0, max_interval=10.0,
+                              growth=2.0, jitter=0.0)
+
+    await scheduler.poll_now(controller)
+    assert await scheduler.poll_now(controller) == 2.0
+    controller.get_session()._last_write = time.monotonic()
+    assert await scheduler.poll_now(controller) == 1.0
+
+    # a write also wakes a running scheduler from a long sleep
+    fake = FakeController([2000])
+    controller = _controller(fake)
+    scheduler = PollScheduler([controller], min_interval=0.05, max_interval=60.0,
+                              growth=1000.0, jitter=0.0, after_write=0.0)
+
+    async def send(query):
+        return b"2500"
+
+    async with scheduler:
+        while scheduler.get_interval(controller) < 1.0:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        assert fake.requests == 2
+
+        await controller.get_session().write("G0.SollTemp", "2500", send)
+        await asyncio.sleep(0.2)
+        assert fake.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_error_backoff_and_listeners():
+    fake = FakeController([2000], errors=[TouchlineConnectionError("down"), TouchlineConnectionError("down"), None])
+    controller = _controller(fake)
+    scheduler = PollScheduler([controller], min_interval=1.0, max_error_interval=3.0, jitter=0.0)
+
+    errors = []
+    updates = []
+    scheduler.add_error_listener(lambda controller, error: errors.append(error))
+    scheduler.add_listener(lambda controller, devices, previous: updates.append((devices, previous)))
+
+    assert await scheduler.poll_now(controller) == 2.0
+    assert await scheduler.poll_now(controller) == 3.0
+    assert await scheduler.poll_now(controller) == 1.0
+    assert len(errors) == 2
+    assert len(updates) == 1
+    assert updates[0][1] == {}
+
+
+@pytest.mark.asyncio
+async def test_dropped_poll_is_not_an_error():
+    fake = FakeController([2000], errors=[StaleRequestError("waited too long"), None])
+    controller = _controller(fake)
+    scheduler = PollScheduler([controller], min_interval=1.0, jitter=0.0)
+    errors = []
+    scheduler.add_error_listener(lambda controller, error: errors.append(error))
+
+    assert await scheduler.poll_now(controller) == 1.0
+    assert errors == []
+    assert await scheduler.poll_now(controller) == 1.0
+    assert scheduler.get_devices(controller)[0].get_current_temperature() == 20.0
+
+
+def test_jitter_stays_within_bounds():
+    scheduler = PollScheduler([], jitter=0.2)
+    for _ in range(100):
+        assert 8.0 <= scheduler._jittered(10.0) <= 12.0
+
+
+@pytest.mark.asyncio
+async def test_background_polling_one_request_in_flight():
+    fake = FakeController([2000])
+    in_flight = []
+    max_in_flight = []
+
+    async def slow(request):
+        in_flight.append(request)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        return await fake(request)
+
+    controller = _controller(slow)
+    scheduler = PollScheduler([controller], min_interval=0.001, max_interval=0.001, jitter=0.0)
+
+    async with scheduler:
+        assert scheduler.is_running()
+        await asyncio.gather(scheduler.poll_now(controller), scheduler.poll_now(controller))
+        await asyncio.sleep(0.05)
+
+    assert not scheduler.is_running()
+    assert fake.requests >= 2
+    assert max(max_in_flight) == 1
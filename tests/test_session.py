@@ -0,0 +1,129 @@
+import asyncio
+import gc
+import httpx
+import pytest
+import time
+import warnings
+from pytouchline_extended import PyTouchline, TouchlineSession, run_sync
+from pytouchline_extended.emulator import TouchlineEmulator
+from unittest.mock import AsyncMock, patch, MagicMock
+
+
+def test_session_shared_per_url():
+    first = PyTouchline(id=0, url="http://192.168.1.10")
+    second = PyTouchline(id=1, url="http://192.168.1.10")
+    other = PyTouchline(id=0, url="http://192.168.1.11")
+
+    assert first._session is second._session
+    assert first._session is not other._session
+    assert first._session.get_url() == "http://192.168.1.10"
+
+
+def test_session_explicit():
+    session = TouchlineSession(url="http://192.168.1.10")
+    touchline = PyTouchline(id=0, url="http://192.168.1.10", session=session)
+    assert touchline._session is session
+    assert TouchlineSession.for_url("http://192.168.1.10") is not session
+
+
+@pytest.mark.asyncio
+async def test_session_reuses_client():
+    session = TouchlineSession(url="http://192.168.1.10", max_connections=2)
+    touchline = PyTouchline(id=0, url="http://192.168.1.10", session=session)
+
+    mock_response = MagicMock()
+    mock_response.is_success = True
+    mock_response.content = b"1"
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(return_value=mock_response)
+        mock_client.return_value.aclose = AsyncMock()
+
+        async with session:
+            await touchline.write_parameter_async("OPMode", 1)
+            await touchline.write_parameter_async("OPMode", 1)
+
+        assert mock_client.call_count == 1
+        assert mock_client.return_value.request.call_count == 2
+        mock_client.return_value.aclose.assert_awaited_once()
+        limits = mock_client.call_args.kwargs["limits"]
+        assert limits.max_connections == 2
+
+        _, kwargs = mock_client.return_value.request.call_args
+        assert kwargs["url"] == "http://192.168.1.10/cgi-bin/writeVal.cgi?G0.OPMode=1"
+        assert kwargs["method"] == "GET"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_are_coalesced():
+    session = TouchlineSession(url="http://192.168.1.10")
+    devices = [PyTouchline(id=0, url="http://192.168.1.10", session=session) for _ in range(3)]
+
+    mock_response = MagicMock()
+    mock_response.is_success = True
+    mock_response.content = b"<body><item_list><i><n>hw.HostName</n><v>Touchline</v></i></item_list></body>"
+
+    async def slow_request(**kwargs):
+        await asyncio.sleep(0.01)
+        return mock_response
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=slow_request)
+        results = await asyncio.gather(*(device.get_hostname_async() for device in devices))
+        assert results == ["Touchline"] * 3
+        assert mock_client.return_value.request.call_count == 1
+
+        # a new read after the previous one finished goes to the controller again
+        assert await devices[0].get_hostname_async() == "Touchline"
+        assert mock_client.return_value.request.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesced_read_errors_reach_every_caller():
+    session = TouchlineSession(url="http://192.168.1.10")
+    devices = [PyTouchline(id=0, url="http://192.168.1.10", session=session) for _ in range(2)]
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=httpx.ConnectError("Connection refused"))
+        results = await asyncio.gather(*(device.get_status_async() for device in devices),
+                                       return_exceptions=True)
+        assert mock_client.return_value.request.call_count == 1
+        for result in results:
+            assert "Network error connecting to Touchline controller" in str(result)
+
+
+def test_session_closes_connections_of_finished_loops():
+    emulator = TouchlineEmulator(devices=1)
+    run_sync(emulator.start())
+    try:
+        session = TouchlineSession(url=emulator.get_url())
+        device = PyTouchline(id=0, url=emulator.get_url(), session=session)
+        for _ in range(3):
+            asyncio.run(device.update_async())
+            time.sleep(0.05)
+        stats = emulator.get_stats()
+        assert stats["connections"] == 3
+        assert stats["max_active_connections"] == 1
+    finally:
+        run_sync(emulator.stop())
+
+
+@pytest.mark.asyncio
+async def test_mixed_sync_and_async_use_keeps_connections_warm():
+    async with TouchlineEmulator(devices=1, hostname="Emulated") as emulator:
+        session = TouchlineSession(url=emulator.get_url())
+        device = PyTouchline(id=0, url=emulator.get_url(), session=session)
+        gc.collect()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ResourceWarning)
+            for _ in range(5):
+                await device.update_async()
+                assert await asyncio.to_thread(device.get_hostname) == "Emulated"
+            gc.collect()
+        await session.aclose()
+
+        stats = emulator.get_stats()
+        assert stats["reads"] == 10
+        # one warm connection for the caller's loop, one for the background loop
+        assert stats["connections"] == 2
+        assert [str(warning.message) for warning in caught if issubclass(warning.category, ResourceWarning)] == []
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import pytest
+import xml.etree.ElementTree as ET
+from pytouchline_extended import PyTouchline, DeviceState, SnapshotStore, refresh_staggered
+from unittest.mock import AsyncMock, patch
+
+
+def _state(temperature):
+    state = DeviceState(0)
+    state.name = "Kitchen"
+    state.temperature = temperature
+    return state
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "touchline.json")
+    store = SnapshotStore(path, min_interval=0.0)
+    store.update("http://10.0.0.1", 0, _state(20.5))
+    assert not store.is_dirty()
+
+    restored = SnapshotStore(path).get("http://10.0.0.1", 0)
+    assert restored == _state(20.5)
+    assert SnapshotStore(path).get("http://10.0.0.1", 1) is None
+    assert list(tmp_path.iterdir()) == [tmp_path / "touchline.json"]
+
+
+def test_snapshot_leaves_out_the_password(tmp_path):
+    path = tmp_path / "touchline.json"
+    state = _state(20.5)
+    state.password = "secret"
+    SnapshotStore(str(path), min_interval=0.0).update("http://10.0.0.1", 0, state)
+
+    assert "secret" not in path.read_text()
+    restored = SnapshotStore(str(path)).get("http://10.0.0.1", 0)
+    assert restored.password is None
+    assert restored.temperature == 20.5
+
+
+def test_snapshot_writes_only_changes(tmp_path):
+    path = tmp_path / "touchline.json"
+    store = SnapshotStore(str(path), min_interval=0.0)
+    store.update("http://10.0.0.1", 0, _state(20.5))
+    path.unlink()
+    store.update("http://10.0.0.1", 0, _state(20.5))
+    assert not path.exists()
+
+
+def test_snapshot_throttles_without_loop(tmp_path):
+    path = tmp_path / "touchline.json"
+    store = SnapshotStore(str(path), min_interval=3600.0)
+    store.update("http://10.0.0.1", 0, _state(20.5))
+    store.update("http://10.0.0.1", 0, _state(21.0))
+    assert store.is_dirty()
+    store.flush()
+    assert not store.is_dirty()
+    assert SnapshotStore(str(path)).get("http://10.0.0.1", 0).temperature == 21.0
+
+
+def test_snapshot_ignores_unreadable_file(tmp_path):
+    path = tmp_path / "touchline.json"
+    path.write_text("{not json")
+    assert SnapshotStore(str(path)).get("http://10.0.0.1", 0) is None
+    path.write_text(json.dumps({"version": 0, "controllers": {}}))
+    assert SnapshotStore(str(path)).get("http://10.0.0.1", 0) is None
+
+
+@pytest.mark.asyncio
+async def test_warm_start_is_stale_until_updated(tmp_path):
+    store = SnapshotStore(str(tmp_path / "touchline.json"), min_interval=0.0)
+    store.update("http://10.0.0.1", 0, _state(20.5))
+
+    device = PyTouchline(id=0, url="http://10.0.0.1", snapshot=store)
+    assert device.is_stale()
+    assert device.get_name() == "Kitchen"
+    assert device.get_current_temperature() == 20.5
+
+    response = ET.fromstring("<body><item_list>"
+                             "<i><n>G0.RaumTemp</n><v>2150</v></i>"
+                             "</item_list></body>")
+    with patch.object(device, '_request_and_receive_xml', new_callable=AsyncMock) as mock_request:
+        mock_request.return_value = response
+        await refresh_staggered([device], spread=0.0)
+
+    assert not device.is_stale()
+    assert device.get_current_temperature() == 21.5
+    assert SnapshotStore(store.get_path()).get("http://10.0.0.1", 0).temperature == 21.5
+
+
+@pytest.mark.asyncio
+async def test_refresh_staggered_reads_each_controller_once(tmp_path):
+    store = SnapshotStore(str(tmp_path / "touchline.json"), min_interval=0.0)
+    devices = [PyTouchline(id=x, url=url, snapshot=store)
+               for url in ("http://10.0.0.1", "http://10.0.0.2") for x in range(2)]
+    started = []
+
+    def controller(url):
+        async def request(request):
+            started.append((url, asyncio.get_running_loop().time()))
+            return ET.fromstring("<body><item_list>"
+                                 "<i><n>G0.RaumTemp</n><v>2150</v></i>"
+                                 "<i><n>G1.RaumTemp</n><v>2050</v></i>"
+                                 "</item_list></body>")
+        return request
+
+    for device in devices:
+        device._request_and_receive_xml = controller(device.get_session().get_url())
+    await refresh_staggered(devices, spread=0.2)
+
+    assert [url for url, _ in started] == ["http://10.0.0.1", "http://10.0.0.2"]
+    assert started[1][1] - started[0][1] >= 0.09
+    assert [device.get_current_temperature() for device in devices] == [21.5, 20.5, 21.5, 20.5]
+    assert not any(device.is_stale() for device in devices)
@@ -0,0 +1,50 @@
+from pytouchline_extended import DeviceState
+
+
+def test_device_state_defaults():
+    state = DeviceState()
+    for slot in DeviceState.__slots__:
+        assert getattr(state, slot) is None
+
+
+def test_device_state_decoding():
+    state = DeviceState(unique_id=3)
+    assert state.set_value("name", "Office", 100)
+    assert state.set_value("RaumTemp", "2175", 100)
+    assert state.set_value("OPMode", "2", 100)
+    assert not state.set_value("unknown", "1", 100)
+
+    assert state.unique_id == 3
+    assert state.name == "Office"
+    assert state.temperature == 21.75
+    assert state.operation_mode == 2
+
+
+def test_device_state_invalid_values_are_missing():
+    state = DeviceState()
+    state.set_value("RaumTemp", "NA", 100)
+    state.set_value("WeekProg", None, 100)
+    assert state.temperature is None
+    assert state.week_program is None
+
+
+def test_device_state_has_no_dict():
+    state = DeviceState()
+    assert not hasattr(state, "__dict__")
+
+
+def test_device_state_equality():
+    first = DeviceState(unique_id=1)
+    second = DeviceState(unique_id=1)
+    assert first == second
+    second.set_value("SollTemp", "2100", 100)
+    assert first != second
+    assert "setpoint=21.0" in repr(second)
+
+
+def test_device_state_repr_masks_the_password():
+    state = DeviceState(unique_id=1)
+    assert "password=None" in repr(state)
+    state.set_value("upass", "secret", 100)
+    assert "secret" not in repr(state)
+    assert "password='***'" in repr(state)
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from pytouchline_extended import (PyTouchline, StreamsTransport, TouchlineSession,
+                                  TouchlineConnectionError, TouchlineTimeoutError)
+from pytouchline_extended.emulator import TouchlineEmulator
+
+
+@pytest.mark.asyncio
+async def test_streams_transport_read_and_write():
+    async with TouchlineEmulator(devices=2, hostname="Emulated") as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url, transport=StreamsTransport) as session:
+            controller = PyTouchline(url=url, session=session)
+            assert await controller.get_hostname_async() == "Emulated"
+            devices = await controller.update_all_async()
+            assert devices[1].get_current_temperature() == 20.1
+
+            assert await devices[0].write_parameter_async("name", "Living room") == b"Living room"
+            assert emulator.get_value("G0.name") == "Living room"
+
+        stats = emulator.get_stats()
+        assert stats["connections"] == 1
+        assert stats["reads"] == 3
+        assert stats["writes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_streams_transport_reconnects_closed_connection():
+    async with TouchlineEmulator(devices=1, keepalive_timeout=0.05) as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url, transport=StreamsTransport) as session:
+            controller = PyTouchline(url=url, session=session)
+            assert await controller.get_number_of_devices_async() == 1
+            await asyncio.sleep(0.2)
+            assert await controller.get_number_of_devices_async() == 1
+        assert emulator.get_stats()["connections"] == 2
+
+
+@pytest.mark.asyncio
+async def test_streams_transport_errors():
+    async with TouchlineEmulator(devices=1, latency=1.0) as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url, transport=StreamsTransport) as session:
+            controller = PyTouchline(url=url, timeout=0.05, session=session)
+            with pytest.raises(TouchlineTimeoutError):
+                await controller.get_number_of_devices_async()
+
+    async with TouchlineSession(url=url, transport=StreamsTransport) as session:
+        controller = PyTouchline(url=url, session=session)
+        with pytest.raises(TouchlineConnectionError):
+            await controller.get_number_of_devices_async()
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import pytest
+from pytouchline_extended import PollScheduler, PyTouchline, TouchlineSession, extract_echo
+from pytouchline_extended.emulator import TouchlineEmulator
+from unittest.mock import AsyncMock, patch, MagicMock
+
+
+def _echo_response(**kwargs):
+    query = kwargs["url"].split("?", 1)[1]
+    assignments = query.split("&")
+    response = MagicMock()
+    response.is_success = True
+    if len(assignments) == 1:
+        response.content = assignments[0].split("=", 1)[1].encode()
+    else:
+        response.content = "&".join(assignments).encode()
+    return response
+
+
+def test_extract_echo():
+    assert extract_echo(b"2200.0", "G0.SollTemp") == b"2200.0"
+    assert extract_echo(b"G0.SollTemp=2200.0&G0.OPMode=1", "G0.OPMode") == b"1"
+    assert extract_echo(b"G0.SollTemp=2200.0\nG1.OPMode=1", "G1.OPMode") == b"1"
+    assert extract_echo(b"a=b", "G0.name") == b"a=b"
+
+
+@pytest.mark.asyncio
+async def test_writes_are_sent_separately_by_default():
+    session = TouchlineSession(url="http://192.168.1.10")
+    touchline = PyTouchline(id=0, url="http://192.168.1.10", session=session)
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=_echo_response)
+        results = await asyncio.gather(touchline.set_operation_mode_async(1),
+                                       touchline.set_week_program_async(2))
+        assert results == [True, True]
+        assert mock_client.return_value.request.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_setpoint_writes_are_debounced():
+    session = TouchlineSession(url="http://192.168.1.10", write_debounce=0.05)
+    touchline = PyTouchline(id=0, url="http://192.168.1.10", session=session)
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=_echo_response)
+
+        async def slider():
+            tasks = []
+            for value in (21.0, 21.5, 22.0):
+                tasks.append(asyncio.ensure_future(touchline.set_target_temperature_async(value)))
+                await asyncio.sleep(0.01)
+            return await asyncio.gather(*tasks)
+
+        results = await slider()
+
+        # every caller learns that the collapsed write that went out succeeded
+        assert results == [True, True, True]
+        assert mock_client.return_value.request.call_count == 1
+        _, kwargs = mock_client.return_value.request.call_args
+        assert kwargs["url"] == "http://192.168.1.10/cgi-bin/writeVal.cgi?G0.SollTemp=2200.0"
+
+
+@pytest.mark.asyncio
+async def test_debounced_writes_report_a_wrong_echo():
+    session = TouchlineSession(url="http://192.168.1.10", write_debounce=0.01)
+    touchline = PyTouchline(id=0, url="http://192.168.1.10", session=session)
+
+    clamped = MagicMock()
+    clamped.is_success = True
+    clamped.content = b"3000"
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(return_value=clamped)
+        results = await asyncio.gather(touchline.set_target_temperature_async(20.0),
+                                       touchline.set_target_temperature_async(35.0))
+        assert results == [False, False]
+        assert mock_client.return_value.request.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_writes_are_merged():
+    session = TouchlineSession(url="http://192.168.1.10", merge_writes=True)
+    devices = [PyTouchline(id=x, url="http://192.168.1.10", session=session) for x in range(2)]
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=_echo_response)
+        results = await asyncio.gather(devices[0].set_operation_mode_async(1),
+                                       devices[1].set_target_temperature_async(22.5))
+        assert results == [True, True]
+        assert mock_client.return_value.request.call_count == 1
+        _, kwargs = mock_client.return_value.request.call_args
+        assert kwargs["url"].endswith("?G0.OPMode=1&G1.SollTemp=2250.0")
+
+
+@pytest.mark.asyncio
+async def test_write_errors_reach_every_caller():
+    session = TouchlineSession(url="http://192.168.1.10", write_debounce=0.01)
+    touchline = PyTouchline(id=0, url="http://192.168.1.10", session=session)
+
+    failed = MagicMock()
+    failed.is_success = False
+    failed.status_code = 500
+    failed.text = "error"
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(return_value=failed)
+        results = await asyncio.gather(touchline.set_operation_mode_async(1),
+                                       touchline.set_operation_mode_async(2),
+                                       return_exceptions=True)
+        assert mock_client.return_value.request.call_count == 1
+        for result in results:
+            assert "Failed to write parameter" in str(result)
+
+
+@pytest.mark.asyncio
+async def test_write_through_until_confirmed():
+    async with TouchlineEmulator(devices=1) as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url) as session:
+            device = PyTouchline(id=0, url=url, session=session)
+            await device.update_async()
+            reads = emulator.get_stats()["reads"]
+
+            assert await device.set_target_temperature_async(22.5)
+            assert await device.set_operation_mode_async(1)
+            assert device.get_target_temperature() == 22.5
+            assert device.get_operation_mode() == 1
+            assert device.get_pending() == {"setpoint": 22.5, "operation_mode": 1}
+            assert emulator.get_stats()["reads"] == reads
+
+            await device.update_async()
+            assert device.get_pending() == {}
+            assert device.get_write_mismatches() == 0
+
+            assert await device.set_week_program_async(2)
+            emulator.set_value("G0.WeekProg", 0)
+            await device.update_async()
+            assert device.get_week_program() == 0
+            assert device.get_pending() == {}
+            assert device.get_write_mismatches() == 1
+
+
+@pytest.mark.asyncio
+async def test_written_values_are_reported_as_changes():
+    async with TouchlineEmulator(devices=1) as emulator:
+        url = emulator.get_url()
+        async with TouchlineSession(url=url) as session:
+            controller = PyTouchline(url=url, session=session)
+            scheduler = PollScheduler([controller], jitter=0.0)
+            changes = []
+            scheduler.add_listener(lambda controller, devices, previous: changes.extend(
+                devices[0].get_state().diff(previous[0]) if previous else []))
+
+            await scheduler.poll_now(controller)
+            device = scheduler.get_devices(controller)[0]
+            assert await device.set_target_temperature_async(25.0)
+            assert device.get_target_temperature() == 25.0
+            await scheduler.poll_now(controller)
+
+            assert changes == [("setpoint", 21.0, 25.0)]
+            assert device.get_pending() == {}
+
+
+@pytest.mark.asyncio
+async def test_write_through_of_a_fractional_setpoint():
+    touchline = PyTouchline(id=0, url="http://192.168.1.60")
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=_echo_response)
+        # 20.1 * 100 is sent as 2010.0000000000002
+        assert await touchline.set_target_temperature_async(20.1)
+
+    assert touchline.get_target_temperature() == 20.1
+    assert touchline.get_pending() == {"setpoint": 20.1}
+
+
+@pytest.mark.asyncio
+async def test_password_writes_are_not_logged(caplog):
+    touchline = PyTouchline(id=0, url="http://192.168.1.60")
+    caplog.set_level(logging.DEBUG, logger="pytouchline_extended")
+
+    def wrong_echo(**kwargs):
+        response = _echo_response(**kwargs)
+        response.content = b"other"
+        return response
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.request = AsyncMock(side_effect=wrong_echo)
+        assert await touchline.write_parameter_async("upass", "secret") == b"other"
+        mock_client.return_value.request = AsyncMock(side_effect=_echo_response)
+        assert await touchline.write_parameter_async("upass", "secret") == b"secret"
+
+    touchline._state.password = "changed"
+    touchline._state_updated()
+    assert touchline.get_write_mismatches() == 1
+    assert "Not applying write of upass" in caplog.text
+    assert "password" in caplog.text
+    assert "secret" not in caplog.text
+    assert "changed" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_written_values_are_quoted():
+    async with TouchlineEmulator(devices=2) as emulator:
+        url = emulator.get_url()
+        mode = emulator.get_value("G1.OPMode")
+        for merge in (False, True):
+            async with TouchlineSession(url=url, merge_writes=merge) as session:
+                devices = [PyTouchline(id=x, url=url, session=session) for x in range(2)]
+                results = await asyncio.gather(devices[0].set_name_async("Living & Dining"),
+                                               devices[1].set_name_async("A&G1.OPMode=3+1"))
+            if not merge:
+                assert results == [True, True]
+            assert emulator.get_value("G0.name") == "Living & Dining"
+            assert emulator.get_value("G1.name") == "A&G1.OPMode=3+1"
+            assert emulator.get_value("G1.OPMode") == mode